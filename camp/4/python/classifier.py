@@ -0,0 +1,222 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from info_csv_output import filter_num as default_filter_num
+from model_compare import MODEL_NAMES, make_model
+
+# calcが出力する統計量の並び（列名の接尾辞）
+STAT_NAMES = ['mean', 'std', 'min', '25%', '50%', '75%', 'max']
+# info_csv_output.pyのanswer -> 活動の名前
+CLASS_NAMES = {0: 'テント生活', 1: '料理', 2: '火おこし', -1: 'その他'}
+
+
+def feature_columns(columns: list) -> list:
+    """calcの特徴量の列名（x_mean, x_std, ..., z_max）を返す"""
+    return [column + '_' + name for column in columns for name in STAT_NAMES]
+
+
+def window_features(values: np.ndarray) -> np.ndarray:
+    """
+    (ウィンドウ数, 行数, 軸の数)の配列から、ウィンドウごとにMakeGraph.calcと同じ統計量を計算する
+    ただし1行だけのウィンドウの標準偏差は、calcのNaNではなく0にする（NaNを受け付けないモデルでも予測できるように）
+    @param values 値の配列
+    @return (ウィンドウ数, 軸の数 * 7)の配列（並びはfeature_columnsと同じ）
+    """
+    count = values.shape[1]
+    quantiles = np.quantile(values, [0.25, 0.5, 0.75], axis=1)
+    stats = np.stack([
+        values.mean(axis=1),
+        values.std(axis=1, ddof=1) if count > 1 else np.zeros(values.shape[::2]),
+        values.min(axis=1),
+        quantiles[0],
+        quantiles[1],
+        quantiles[2],
+        values.max(axis=1),
+    ], axis=2)
+    return stats.reshape(len(values), -1)
+
+
+def load_training_data(pattern: str = '../data/output/*acc_info.csv') -> tuple:
+    """
+    info_csv_output.pyが出力した特徴量のcsvを読み込む（check_ai.ipynbと同じ前処理）
+    @param pattern csvファイルのパターン
+    @return (特徴量のデータフレーム, 正解のSeries)
+    """
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError('特徴量のcsvがありません: ' + pattern)
+    df = pd.concat([pd.read_csv(file_name, index_col=None, header=0) for file_name in files],
+                   axis=0, ignore_index=True)
+    x = df.drop(['answer', 'Unnamed: 0', 'label', 'place'], axis=1, errors='ignore')
+    return x, df['answer']
+
+
+def save_model(file_path: str, model, columns: list, filter_num: int = default_filter_num) -> None:
+    """
+    学習済みのモデルと特徴量の仕様をまとめて保存する
+    @param file_path 保存先のファイル（.joblib）
+    @param model 学習済みのモデル（scikit-learnのもの）
+    @param columns 学習に使った特徴量の列名（この順番でモデルに渡す）
+    @param filter_num calcのウィンドウの行数
+    """
+    axes = list(dict.fromkeys(column.rsplit('_', 1)[0] for column in columns))
+    joblib.dump({
+        'model': model,
+        'spec': {'filter_num': filter_num, 'axes': axes, 'columns': list(columns), 'classes': CLASS_NAMES},
+    }, file_path)
+
+
+class StreamingClassifier:
+    """
+    加速度のデータを少しずつ受け取り、filter_num行のウィンドウがそろうたびに活動を予測する
+    ウィンドウの区切りと特徴量はMakeGraph.calc（camp/4）と同じで、最後の行数の足りないウィンドウはclose()で予測する
+    保持するのは閉じていないウィンドウの行だけ
+    @param bundle save_modelで保存した内容（load_model_bundleの戻り値）
+    """
+
+    def __init__(self, bundle: dict):
+        self.model = bundle['model']
+        self.spec = bundle['spec']
+        self.filter_num = self.spec['filter_num']
+        self.axes = self.spec['axes']
+        computed = feature_columns(self.axes)
+        # モデルに渡す列の順番（学習時の並び）
+        self.order = [computed.index(column) for column in self.spec['columns']]
+        self.buffer = np.empty((0, len(self.axes)))
+        self.offset = 0
+        # ウィンドウごとの遅れ 秒（ウィンドウの最後の行を受け取ってから予測するまで）
+        self.latencies = []
+        self.samples = 0
+        self.busy = 0.0
+
+    def push(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        データを追加して、そろったウィンドウの予測を返す
+        @param chunk 追加するデータフレーム（x, y, zの列を持つ）
+        @return ウィンドウごとの予測のデータフレーム（indexはウィンドウの先頭の行）
+        """
+        received = time.perf_counter()
+        self.buffer = np.concatenate([self.buffer, chunk[self.axes].to_numpy(dtype=np.float64)])
+        self.samples += len(chunk)
+        complete = len(self.buffer) // self.filter_num
+        return self.__predict(complete * self.filter_num, received)
+
+    def close(self) -> pd.DataFrame:
+        """残りの行数の足りないウィンドウを予測する（1行だけの場合、標準偏差は0にする）"""
+        return self.__predict(len(self.buffer), time.perf_counter())
+
+    def __predict(self, rows: int, received: float) -> pd.DataFrame:
+        if rows == 0:
+            return pd.DataFrame(columns=['prediction', 'activity'])
+
+        windows = self.buffer[:rows]
+        size = min(self.filter_num, rows)
+        features = window_features(windows.reshape(-1, size, len(self.axes)))[:, self.order]
+        x = pd.DataFrame(features, columns=self.spec['columns'])
+        prediction = self.model.predict(x)
+
+        index = self.offset + np.arange(len(features)) * self.filter_num
+        result = x.set_index(index)
+        result['prediction'] = prediction
+        result['activity'] = [self.spec['classes'].get(int(value), str(value)) for value in prediction]
+
+        self.buffer = self.buffer[rows:]
+        self.offset += rows
+        finished = time.perf_counter()
+        self.latencies.extend([finished - received] * len(features))
+        self.busy += finished - received
+        return result
+
+    def latency_report(self) -> dict:
+        """
+        ウィンドウごとの遅れの分位点と処理の速さを返す
+        @return 遅れ（ms）のp50, p90, p99, max、ウィンドウ数、1秒あたりに処理できた行数
+        """
+        latencies = np.array(self.latencies) * 1000
+        report = {'windows': len(latencies),
+                  'samples_per_second': self.samples / self.busy if self.busy > 0 else float('inf')}
+        for name, q in [('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('max_ms', 100)]:
+            report[name] = float(np.percentile(latencies, q)) if len(latencies) else float('nan')
+        return report
+
+
+def load_model_bundle(file_path: str) -> dict:
+    """save_modelで保存したモデルと特徴量の仕様を読み込む"""
+    return joblib.load(file_path)
+
+
+def iter_stdin_chunks(columns: list, chunksize: int):
+    """標準入力から「time,x,y,z」の行を読み込み、chunksize行ずつデータフレームにして返す（ライブの入力用）"""
+    rows = []
+    for line in sys.stdin:
+        fields = line.strip().split(',')
+        if len(fields) != len(columns):
+            continue
+        try:
+            rows.append([float(field) for field in fields])
+        except ValueError:
+            # ヘッダーの行など
+            continue
+        if len(rows) >= chunksize:
+            yield pd.DataFrame(rows, columns=columns)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def classify_stream(classifier: StreamingClassifier, chunks) -> pd.DataFrame:
+    """
+    データフレームを順に渡して、全てのウィンドウの予測を返す
+    @param classifier StreamingClassifier
+    @param chunks データフレームのイテレータ
+    @return 全てのウィンドウの予測のデータフレーム
+    """
+    results = [classifier.push(chunk) for chunk in chunks]
+    results.append(classifier.close())
+    results = [result for result in results if len(result) > 0]
+    return pd.concat(results) if results else pd.DataFrame(columns=['prediction', 'activity'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='加速度のデータから活動（テント生活・料理・火おこし）をウィンドウごとに予測する')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='特徴量のcsvでモデルを学習して保存する')
+    train_parser.add_argument('--model', default='random_forest', choices=MODEL_NAMES, help='モデルの名前')
+    train_parser.add_argument('--output', default='../data/output/model.joblib', help='保存先のファイル')
+
+    predict_parser = subparsers.add_parser('predict', help='セッションのacc.csv（または標準入力）を少しずつ渡して予測する')
+    predict_parser.add_argument('folder', nargs='?', default=None, help='フォルダ名（省略すると標準入力から「time,x,y,z」を読む）')
+    predict_parser.add_argument('--model', default='../data/output/model.joblib', help='保存したモデルのファイル')
+    predict_parser.add_argument('--chunksize', type=int, default=None,
+                                help='一度に渡す行数（省略するとウィンドウの行数で、1ウィンドウずつ渡す）')
+    predict_parser.add_argument('--output', default=None, help='予測を保存するcsv')
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        x, t = load_training_data()
+        model = make_model(args.model)
+        model.fit(x, t)
+        save_model(args.output, model, list(x.columns))
+        print(args.output)
+    else:
+        bundle = load_model_bundle(args.model)
+        classifier = StreamingClassifier(bundle)
+        chunksize = args.chunksize or classifier.filter_num
+        if args.folder is None:
+            chunks = iter_stdin_chunks(['time'] + classifier.axes, chunksize)
+        else:
+            chunks = pd.read_csv(os.path.join('../data', args.folder, 'acc.csv'), chunksize=chunksize)
+        predictions = classify_stream(classifier, chunks)
+
+        if args.output is not None:
+            predictions.to_csv(args.output, index=True)
+        print(predictions['activity'].value_counts().to_string())
+        print(classifier.latency_report())
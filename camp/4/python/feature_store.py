@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import inspect
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# 特徴量を保存するフォルダ
+STORE_DIR = '../cache/features'
+# 特徴量のファイルの形式のバージョン（保存の形式を変えたら上げる）
+STORE_VERSION = 2
+
+# ファイルのパス -> ((大きさ, 更新時刻), ハッシュ)
+_file_hashes = {}
+
+
+class FeatureKey(NamedTuple):
+    """
+    特徴量のブロックのキー
+    session: セッションのフォルダ名
+    sensor: センサー名（acc, gyro, ...）
+    window: ウィンドウの行数
+    hop: ウィンドウをずらす行数
+    feature_set: 特徴量の種類の名前（calcなど）
+    fingerprint: 特徴量を計算するコードと元のcsvのハッシュ
+    """
+    session: str
+    sensor: str
+    window: int
+    hop: int
+    feature_set: str
+    fingerprint: str
+
+    def file_name(self) -> str:
+        """保存するファイル名（同じセッション・センサーのフォルダに置く）"""
+        return f'{self.feature_set}_w{self.window}_h{self.hop}_{self.fingerprint}.npz'
+
+    def group(self) -> tuple:
+        """フィンガープリント以外のキー（同じグループの古いバージョンをgcで消す）"""
+        return self[:5]
+
+
+def file_hash(file_path: str) -> str:
+    """
+    ファイルの中身のハッシュを返す
+    大きさと更新時刻が変わっていなければ前に計算したものを使う
+    @param file_path ファイルのパス
+    @return ハッシュの16進数の文字列
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _file_hashes.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    _file_hashes[file_path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def feature_fingerprint(sources: list, source_paths: list) -> str:
+    """
+    特徴量を計算するコードと元のファイルの中身から、特徴量のバージョンを表すハッシュを作る
+    どれかが変わると別のキーになるので、古い特徴量を読み込むことはない
+    @param sources 特徴量を計算する関数・モジュールの一覧（MakeGraph.calc, labelingなど、ソースコードを使う）
+    @param source_paths 元のファイルのパスの一覧（無いファイルは無いことを記録する）
+    @return ハッシュの16進数の文字列
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(str(STORE_VERSION).encode('utf-8'))
+    for source in sources:
+        digest.update(inspect.getsource(source).encode('utf-8'))
+    for source_path in source_paths:
+        digest.update((file_hash(source_path) if os.path.exists(source_path) else 'missing').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """
+    セッション・センサー・ウィンドウ・特徴量の種類・バージョンをキーにして、特徴量のデータフレームを保存する
+    ファイルは「root/セッション/センサー/キー.npz」で、列ごとの配列とindexを保存する
+    キーにバージョンのハッシュを含めるので、パラメーターやコードを変えても古いファイルを上書きしない（gcで消す）
+    @param root 保存するフォルダ
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def path(self, key: FeatureKey) -> str:
+        """キーのファイルのパス"""
+        return os.path.join(self.root, key.session, key.sensor, key.file_name())
+
+    def get(self, key: FeatureKey) -> pd.DataFrame | None:
+        """
+        保存した特徴量を読み込む
+        @param key FeatureKey
+        @return 特徴量のデータフレーム（保存していなければNone）
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as block:
+            columns = {}
+            for i, column in enumerate(block['columns'].tolist()):
+                values = block[f'c{i}']
+                if values.dtype.kind == 'U':
+                    # 文字列の列は、Noneだった行をNoneに戻す
+                    values = values.astype(object)
+                    values[block[f'n{i}']] = None
+                columns[column] = values
+            index = block['index']
+        return pd.DataFrame(columns, index=index)
+
+    def put(self, key: FeatureKey, df: pd.DataFrame) -> str:
+        """
+        特徴量を保存する（数値の列は型のまま、それ以外の列は文字列とNoneの行の印で保存する）
+        一時ファイルに書いてから置き換えるので、途中で止まっても壊れたファイルは残らない
+        @param key FeatureKey
+        @param df 特徴量のデータフレーム
+        @return 保存したファイルのパス
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        arrays = {'columns': np.array(df.columns, dtype=str), 'index': df.index.to_numpy()}
+        for i, column in enumerate(df.columns):
+            values = df[column]
+            if pd.api.types.is_numeric_dtype(values):
+                arrays[f'c{i}'] = values.to_numpy()
+            else:
+                missing = values.isna().to_numpy()
+                arrays[f'c{i}'] = np.where(missing, '', values.astype(object).to_numpy()).astype(str)
+                arrays[f'n{i}'] = missing
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    def get_or_compute(self, key: FeatureKey, compute) -> pd.DataFrame:
+        """
+        保存した特徴量があれば読み込み、なければ計算して保存する
+        @param key FeatureKey
+        @param compute 特徴量を計算する関数（引数なし）
+        @return 特徴量のデータフレーム
+        """
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            self.put(key, df)
+        return df
+
+    def keys(self) -> list:
+        """保存している全ての特徴量のキー"""
+        keys = []
+        if not os.path.isdir(self.root):
+            return keys
+        for session in sorted(os.listdir(self.root)):
+            session_dir = os.path.join(self.root, session)
+            if not os.path.isdir(session_dir):
+                continue
+            for sensor in sorted(os.listdir(session_dir)):
+                sensor_dir = os.path.join(session_dir, sensor)
+                for file_name in sorted(os.listdir(sensor_dir)):
+                    key = _parse_file_name(session, sensor, file_name)
+                    if key is not None:
+                        keys.append(key)
+        return keys
+
+    def load_many(self, keys: list) -> pd.DataFrame:
+        """
+        複数のセッションの特徴量をまとめて読み込む
+        @param keys FeatureKeyの一覧（保存していないものは飛ばす）
+        @return セッション名をindexに加えて一つにまとめたデータフレーム
+        """
+        dfs = {}
+        for key in keys:
+            df = self.get(key)
+            if df is not None:
+                dfs[key.session] = df
+        if not dfs:
+            return pd.DataFrame()
+        return pd.concat(dfs, names=['folder', None])
+
+    def gc(self, current: list = None, dry_run: bool = False) -> list:
+        """
+        古いバージョンの特徴量を消す
+        currentを指定した場合は、そのキーと同じグループ（フィンガープリント以外が同じ）の他のバージョンを消す
+        指定しない場合は、グループごとに最後に保存したもの以外を消す
+        @param current 残すキーの一覧
+        @param dry_run Trueなら消さずに、消すファイルの一覧だけ返す
+        @return 消したファイルのパスの一覧
+        """
+        keys = self.keys()
+        if current is not None:
+            keep = set(current)
+            groups = {key.group() for key in current}
+            stale = [key for key in keys if key.group() in groups and key not in keep]
+        else:
+            latest = {}
+            for key in keys:
+                best = latest.get(key.group())
+                if best is None or os.path.getmtime(self.path(key)) > os.path.getmtime(self.path(best)):
+                    latest[key.group()] = key
+            stale = [key for key in keys if latest[key.group()] != key]
+
+        removed = [self.path(key) for key in stale]
+        if not dry_run:
+            for path in removed:
+                os.remove(path)
+        return removed
+
+
+def _parse_file_name(session: str, sensor: str, file_name: str) -> FeatureKey | None:
+    """ファイル名からキーを作る（特徴量のファイルでなければNone）"""
+    if not file_name.endswith('.npz') or file_name.endswith('.tmp.npz'):
+        return None
+    parts = file_name[:-len('.npz')].rsplit('_', 3)
+    if len(parts) != 4 or not parts[1].startswith('w') or not parts[2].startswith('h'):
+        return None
+    try:
+        return FeatureKey(session, sensor, int(parts[1][1:]), int(parts[2][1:]), parts[0], parts[3])
+    except ValueError:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='保存した特徴量の一覧の表示・古いバージョンの削除')
+    parser.add_argument('command', choices=['list', 'gc'], help='list: 一覧を表示する, gc: 古いバージョンを消す')
+    parser.add_argument('--root', default=STORE_DIR, help='特徴量を保存したフォルダ')
+    parser.add_argument('--dry-run', action='store_true', help='gcで消さずに、消すファイルを表示する')
+    args = parser.parse_args()
+
+    store = FeatureStore(args.root)
+    if args.command == 'list':
+        for key in store.keys():
+            print(store.path(key))
+    else:
+        for path in store.gc(dry_run=args.dry_run):
+            print(path)
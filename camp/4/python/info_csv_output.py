@@ -1,44 +1,158 @@
+import argparse
+import logging
 import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
 
 from Graphs import MakeGraph ,GraphAxis , GraphViewOptions
+import labeling
+from feature_store import STORE_DIR, FeatureKey, FeatureStore, feature_fingerprint
+from labeling import label_windows
 
+logger = logging.getLogger(__name__)
 
-def info_csv_output():
-    # ../data/以下のフォルダ名を全て取得
-    folder_names = os.listdir('../data')
+# calcのウィンドウの行数
+filter_num = 50
 
-    # フォルダ名を一つずつ取り出す
-    for folder_name in folder_names:
-        print(folder_name)
 
+def session_folder_names() -> list:
+    """../data/以下のセッションのフォルダ名を名前順に返す"""
+    folder_names = []
+    for folder_name in sorted(os.listdir('../data')):
         # .DS_Storeを除外
         if folder_name == '.DS_Store' or folder_name == "output":
             continue
+        folder_names.append(folder_name)
+    return folder_names
+
+
+def session_answer(folder_name: str) -> int:
+    """セッションの正解データ（活動の番号）をフォルダ名から決める"""
+    # folder_nameがテント生活を含まれていた場合は0
+    # folder_nameが焼きそばを含まれていた場合は1
+    # folder_nameが肉を焼くを含まれていた場合は1
+    # folder_nameが火おこしを含まれていた場合は2
+    if 'テント生活' in folder_name:
+        return 0
+    elif '焼きそば' in folder_name:
+        return 1
+    elif '肉を焼く' in folder_name:
+        return 1
+    elif '火おこし' in folder_name:
+        return 2
+    else:
+        return -1
+
+
+def info_key(folder_name: str) -> FeatureKey:
+    """
+    セッションの特徴量（calcの結果にラベルと正解データを足したもの）のキー
+    calc・labeling.py・session_answerのコードか、acc.csv・ans.csv・ans-place.csvが変わると変わる
+    """
+    folder = os.path.join('../data', folder_name)
+    fingerprint = feature_fingerprint([MakeGraph.calc, labeling, session_answer],
+                                      [os.path.join(folder, file_name)
+                                       for file_name in ['acc.csv', 'ans.csv', 'ans-place.csv']])
+    return FeatureKey(folder_name, 'acc', filter_num, filter_num, 'info', fingerprint)
 
-        # グラフを作成
-        make_graph = MakeGraph(folder_name)
 
-        acc_df = make_graph.acc_df
-        info_df = make_graph.calc(acc_df, 50)
+def session_info(folder_name: str, store_root: str = None) -> pd.DataFrame:
+    """
+    1つのセッションの特徴量を計算してcsvに出力する
+    @param folder_name フォルダ名
+    @param store_root 特徴量を保存するフォルダ（Noneなら毎回計算する）
+    @return 特徴量のデータフレーム
+    """
+    # グラフを作成
+    make_graph = MakeGraph(folder_name)
 
+    acc_df = make_graph.acc_df
+
+    def compute() -> pd.DataFrame:
+        info_df = make_graph.calc(acc_df, filter_num)
+        # ans.csvの区間から各ウィンドウのラベル（椅子に座る、火が起きる、...）を足す
+        info_df['label'] = label_windows(folder_name, acc_df, info_df, filter_num)
+        # ans-place.csvがあるセッション（焼きそば1, 2）は場所のラベルも足す
+        info_df['place'] = label_windows(folder_name, acc_df, info_df, filter_num, file_name='ans-place.csv')
         # 正解データを足す
-        # folder_nameがテント生活を含まれていた場合は0
-        # folder_nameが焼きそばを含まれていた場合は1
-        # folder_nameが肉を焼くを含まれていた場合は1
-        # folder_nameが火おこしを含まれていた場合は2
-
-        if 'テント生活' in folder_name:
-            info_df['answer'] = 0
-        elif '焼きそば' in folder_name:
-            info_df['answer'] = 1
-        elif '肉を焼く' in folder_name:
-            info_df['answer'] = 1
-        elif '火おこし' in folder_name:
-            info_df['answer'] = 2
-        else:
-            info_df['answer'] = -1
-
-        make_graph.output_csv(info_df, file_name= folder_name + 'acc_info.csv')
+        info_df['answer'] = session_answer(folder_name)
+        return info_df
+
+    if store_root is None:
+        info_df = compute()
+    else:
+        # 同じパラメーター・コード・データで計算したものがあれば、計算せずに読み込む
+        info_df = FeatureStore(store_root).get_or_compute(info_key(folder_name), compute)
+
+    make_graph.output_csv(info_df, file_name=folder_name + 'acc_info')
+    return info_df
+
+
+def try_session_info(folder_name: str, store_root: str = None) -> tuple:
+    """
+    session_infoを実行し、失敗した場合は例外を止めずにエラー内容を返す
+    @return (フォルダ名, 特徴量のデータフレーム（失敗した場合はNone）, エラー内容（成功した場合はNone）)
+    """
+    try:
+        return folder_name, session_info(folder_name, store_root), None
+    except Exception:
+        return folder_name, None, traceback.format_exc()
+
+
+def info_csv_output(workers: int = 1, store_root: str = None) -> tuple:
+    """
+    全てのセッションの特徴量をcsvに出力する
+    workersが2以上の場合はセッションごとにプロセスを分けて並列に計算する
+    結果はworkersに関係なくフォルダ名の順に並ぶ
+    store_rootを指定した場合は保存した特徴量を使い、終わったら同じセッションの古いバージョンを消す
+    @param workers プロセス数
+    @param store_root 特徴量を保存するフォルダ（Noneなら毎回計算する）
+    @return (全てのセッションをまとめた特徴量のデータフレーム, フォルダ名 -> エラー内容)
+    """
+    folder_names = session_folder_names()
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(try_session_info, folder_names, repeat(store_root)))
+    else:
+        results = [try_session_info(folder_name, store_root) for folder_name in folder_names]
+
+    info_dfs = {}
+    errors = {}
+    for folder_name, info_df, error in results:
+        if error is not None:
+            logger.error('%s\n%s', folder_name, error)
+            errors[folder_name] = error
+            continue
+        logger.info('%s', folder_name)
+        info_dfs[folder_name] = info_df
+
+    if store_root is not None:
+        FeatureStore(store_root).gc(current=[info_key(folder_name) for folder_name in info_dfs])
+
+    # フォルダ名をindexに加えて一つのデータフレームにまとめる
+    if info_dfs:
+        all_info_df = pd.concat(info_dfs, names=['folder', None])
+    else:
+        all_info_df = pd.DataFrame()
+    return all_info_df, errors
+
 
 if __name__ == '__main__':
-    info_csv_output()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列に処理するプロセス数')
+    parser.add_argument('--combined', default=None, help='全てのセッションをまとめたcsvの出力先')
+    parser.add_argument('--store', default=STORE_DIR, help='特徴量を保存するフォルダ')
+    parser.add_argument('--no-store', action='store_true', help='保存した特徴量を使わずに全て計算する')
+    parser.add_argument('--log-level', default='INFO', help='ログの出力レベル（DEBUG, INFO, WARNINGなど）')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+
+    all_info_df, errors = info_csv_output(workers=args.workers, store_root=None if args.no_store else args.store)
+    if args.combined is not None:
+        all_info_df.to_csv(args.combined, index=True)
+    if errors:
+        logger.error('失敗したフォルダ: %s', ', '.join(errors))
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# これより小さい時刻は、UNIX時間ではなく記録開始からの経過時間 msとして扱う（1e11 msは1973年）
+relative_time_limit = 1e11
+
+
+class IntervalLabeler:
+    """
+    ans.csvの行から区間のインデックスを作り、時刻にラベルを付ける
+    ans.csvの各行はその時刻から次の行の時刻までの区間のラベルとし、最後の行はそれ以降全てとする
+    @param ans_df ans.csvのデータフレーム（time: UNIX時間 ms, content: ラベル）
+    """
+
+    def __init__(self, ans_df: pd.DataFrame):
+        ans_df = ans_df.sort_values('time', kind='stable')
+        self.starts = ans_df['time'].to_numpy(dtype=np.float64)
+        self.labels = ans_df['content'].to_numpy(dtype=object)
+
+    """
+    ans.csvを読み込んでIntervalLabelerを作成する
+    @param file_path ans.csvのパス
+    @return IntervalLabeler
+    """
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> 'IntervalLabeler':
+        return cls(pd.read_csv(file_path))
+
+    """
+    時刻にラベルを付ける
+    二分探索を一回行うだけなので、ウィンドウの数が多くてもほとんど時間がかからない
+    @param times 時刻の配列（UNIX時間 ms）
+    @return ラベルの配列（最初の行より前の時刻はNone）
+    """
+
+    def label(self, times: np.ndarray) -> np.ndarray:
+        index = np.searchsorted(self.starts, np.asarray(times, dtype=np.float64), side='right') - 1
+        labels = np.full(len(index), None, dtype=object)
+        if len(self.labels) > 0:
+            labeled = index >= 0
+            labels[labeled] = self.labels[index[labeled]]
+        return labels
+
+
+def window_times(time: np.ndarray, starts: np.ndarray, filter_num: int) -> np.ndarray:
+    """
+    行数で区切ったウィンドウ（MakeGraph.calc）の中央の時刻を返す
+    @param time 時刻の配列
+    @param starts ウィンドウの先頭の行（calcの結果のindex）
+    @param filter_num ウィンドウの行数
+    @return ウィンドウの中央の時刻の配列
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.minimum(starts + filter_num, len(time)) - 1
+    return (time[starts] + time[ends]) / 2
+
+
+def label_windows(folder_name: str, acc_df: pd.DataFrame, info_df: pd.DataFrame, filter_num: int,
+                  file_name: str = 'ans.csv') -> np.ndarray:
+    """
+    セッションの正解ファイルを使って、calcの各ウィンドウにラベルを付ける
+    ans.csvは動作（椅子に座る、火が起きる、...）、ans-place.csvは場所のラベルで、どちらも同じ形式
+    MakeGraphのtimeは0から始めた秒なので、acc.csvの先頭の時刻を使ってUNIX時間 msに戻す
+    正解ファイルの時刻がrelative_time_limitより小さい場合は、記録開始からの経過時間 msとして扱う
+    @param folder_name フォルダ名
+    @param acc_df MakeGraphのacc_df
+    @param info_df calcの結果
+    @param filter_num calcのウィンドウの行数
+    @param file_name 正解ファイルの名前（ans.csv, ans-place.csv）
+    @return ラベルの配列（正解ファイルが無い場合は全てNone）
+    """
+    folder = os.path.join('../data', folder_name)
+    ans_file = os.path.join(folder, file_name)
+    if not os.path.exists(ans_file) or len(info_df) == 0:
+        return np.full(len(info_df), None, dtype=object)
+
+    labeler = IntervalLabeler.from_csv(ans_file)
+    time = acc_df['time'].to_numpy(dtype=np.float64) * 1000
+    # 手で付けたans.csvは記録開始からの経過時間 msになっている（焼きそば1など）
+    if len(labeler.starts) > 0 and labeler.starts.max() >= relative_time_limit:
+        time = time + pd.read_csv(os.path.join(folder, 'acc.csv'), nrows=1)['time'][0]
+    return labeler.label(window_times(time, info_df.index, filter_num))
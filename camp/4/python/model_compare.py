@@ -0,0 +1,202 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import StratifiedGroupKFold, StratifiedKFold
+
+# 特徴量のcsv（info_csv_output.pyの出力）
+FEATURE_PATTERN = '../data/output/*acc_info.csv'
+# 読み込んだ特徴量のキャッシュ
+CACHE_PATH = '../cache/features.npz'
+
+
+def _model_factories() -> dict:
+    """check_ai.ipynbで比べているモデルの名前 -> モデルを作る関数"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.svm import SVC, LinearSVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    return {
+        'svc': SVC,
+        'linear_svc': LinearSVC,
+        'tree': DecisionTreeClassifier,
+        'logistic': LogisticRegression,
+        'random_forest': RandomForestClassifier,
+        'mlp': MLPClassifier,
+        'knn': KNeighborsClassifier,
+        'naive_bayes': GaussianNB,
+        'gradient_boosting': GradientBoostingClassifier,
+        'sgd': SGDClassifier,
+    }
+
+
+MODEL_NAMES = list(_model_factories())
+
+
+def make_model(name: str, seed: int = None):
+    """
+    モデルの名前からモデルを作る
+    @param name MODEL_NAMESのどれか
+    @param seed 乱数のシード（random_stateを持つモデルだけに使う、Noneなら指定しない）
+    @return モデル（学習前）
+    """
+    factories = _model_factories()
+    if name not in factories:
+        raise ValueError('モデルは ' + ', '.join(factories) + ' のどれかを指定してください: ' + name)
+    model = factories[name]()
+    if seed is not None and 'random_state' in model.get_params():
+        model.set_params(random_state=seed)
+    return model
+
+
+def _files_signature(files: list) -> np.ndarray:
+    """ファイル名・大きさ・更新時刻の一覧（キャッシュが古いかどうかの判定に使う）"""
+    return np.array([f'{os.path.basename(file_name)}:{os.path.getsize(file_name)}:{os.path.getmtime(file_name)}'
+                     for file_name in files])
+
+
+def load_feature_matrix(pattern: str = FEATURE_PATTERN, cache_path: str | None = CACHE_PATH) -> dict:
+    """
+    特徴量のcsvを全て読み込み、1つの配列にまとめる（check_ai.ipynbと同じ前処理）
+    まとめた配列はcache_pathに保存し、csvが変わっていなければ次からはそれを読み込む
+    @param pattern 特徴量のcsvのパターン
+    @param cache_path キャッシュのファイル（Noneならキャッシュしない）
+    @return {'x': 特徴量（float32）, 't': 正解（int8）, 'groups': セッションの番号, 'columns': 列名, 'sessions': セッション名}
+    """
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError('特徴量のcsvがありません: ' + pattern)
+    signature = _files_signature(files)
+
+    if cache_path is not None and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cache:
+            if np.array_equal(cache['signature'], signature):
+                return {key: cache[key] for key in ['x', 't', 'groups', 'columns', 'sessions']}
+
+    dfs = [pd.read_csv(file_name, index_col=None, header=0) for file_name in files]
+    df = pd.concat(dfs, axis=0, ignore_index=True)
+    x = df.drop(['answer', 'Unnamed: 0', 'label', 'place'], axis=1, errors='ignore')
+    matrix = {
+        'x': x.to_numpy(dtype=np.float32),
+        't': df['answer'].to_numpy(dtype=np.int8),
+        'groups': np.repeat(np.arange(len(dfs), dtype=np.int16), [len(session_df) for session_df in dfs]),
+        'columns': np.array(x.columns, dtype=str),
+        'sessions': np.array([os.path.basename(file_name).split('acc_info')[0] for file_name in files]),
+    }
+
+    if cache_path is not None:
+        folder = os.path.dirname(cache_path)
+        if folder != '':
+            os.makedirs(folder, exist_ok=True)
+        np.savez(cache_path, signature=signature, **matrix)
+    return matrix
+
+
+# ワーカーのプロセスで使う特徴量（プロセスごとに1回だけ受け取る）
+_worker_matrix = {}
+
+
+def _init_worker(x: np.ndarray, t: np.ndarray) -> None:
+    _worker_matrix['x'] = x
+    _worker_matrix['t'] = t
+
+
+def _evaluate_fold(task: tuple) -> dict:
+    """
+    1つのモデルを1つの分割で学習・評価する
+    @param task (モデルの名前, 分割の番号, 学習に使う行, 評価に使う行, 乱数のシード)
+    @return 評価指標と学習・予測の時間
+    """
+    name, fold, train_index, test_index, seed = task
+    x, t = _worker_matrix['x'], _worker_matrix['t']
+    model = make_model(name, seed)
+
+    start = time.perf_counter()
+    model.fit(x[train_index], t[train_index])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(x[test_index])
+    predict_time = time.perf_counter() - start
+
+    t_test = t[test_index]
+    return {
+        'model': name,
+        'fold': fold,
+        'accuracy': accuracy_score(t_test, y_pred),
+        'precision': precision_score(t_test, y_pred, average='weighted', zero_division=0),
+        'recall': recall_score(t_test, y_pred, average='weighted', zero_division=0),
+        'f1': f1_score(t_test, y_pred, average='weighted', zero_division=0),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+
+def compare_models(models: list = None, n_splits: int = 5, workers: int = 1, by_session: bool = False,
+                   seed: int = 0, matrix: dict = None) -> tuple:
+    """
+    層化k分割交差検証で複数のモデルを比べる
+    (モデル, 分割)の組ごとにプロセスを分けて並列に学習・評価する（結果はworkersに関係なく同じ）
+    @param models モデルの名前の一覧（Noneなら全て）
+    @param n_splits 分割の数
+    @param workers プロセス数
+    @param by_session Trueなら同じセッションのウィンドウが学習と評価に分かれないように分割する
+    @param seed 分割とモデルの乱数のシード
+    @param matrix load_feature_matrixの戻り値（Noneなら読み込む）
+    @return (モデルごとの平均のデータフレーム（f1の高い順）, 分割ごとの結果のデータフレーム)
+    """
+    models = MODEL_NAMES if models is None else models
+    for name in models:
+        # 並列に実行する前に名前を確かめる
+        make_model(name)
+    matrix = load_feature_matrix() if matrix is None else matrix
+    x, t = matrix['x'], matrix['t']
+
+    if by_session:
+        splitter = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        splits = list(splitter.split(x, t, matrix['groups']))
+    else:
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        splits = list(splitter.split(x, t))
+    tasks = [(name, fold, train_index, test_index, seed)
+             for name in models for fold, (train_index, test_index) in enumerate(splits)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(x, t)) as executor:
+            results = list(executor.map(_evaluate_fold, tasks))
+    else:
+        _init_worker(x, t)
+        results = [_evaluate_fold(task) for task in tasks]
+
+    folds_df = pd.DataFrame(results)
+    summary_df = folds_df.drop(columns='fold').groupby('model', sort=False).mean()
+    summary_df['f1_std'] = folds_df.groupby('model', sort=False)['f1'].std()
+    summary_df = summary_df.sort_values('f1', ascending=False)
+    return summary_df, folds_df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='特徴量のcsvで複数のモデルを層化k分割交差検証で比べる')
+    parser.add_argument('models', nargs='*', help='モデルの名前（省略すると全て: ' + ', '.join(MODEL_NAMES) + '）')
+    parser.add_argument('--splits', type=int, default=5, help='分割の数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列に処理するプロセス数')
+    parser.add_argument('--by-session', action='store_true', help='セッション単位で分割する')
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード')
+    parser.add_argument('--output', default=None, help='結果を保存するcsv')
+    args = parser.parse_args()
+
+    summary_df, _ = compare_models(args.models or None, n_splits=args.splits, workers=args.workers,
+                                   by_session=args.by_session, seed=args.seed)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summary_df)
+    if args.output is not None:
+        summary_df.to_csv(args.output)
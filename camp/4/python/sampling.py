@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+
+def sampling_frequency(data, column: str = 'time', time_scale: float = 1000) -> float:
+    """
+    サンプリング周波数[Hz]を求める（camp/5/python/sampling.pyのsampling_frequencyと同じ推定）
+    平均ではなく間隔の中央値を使うので、記録の途切れや間引きがあっても周波数はずれない
+    @param data データフレーム、時刻のSeriesまたは配列
+    @param column 時刻の列名
+    @param time_scale timeの1秒あたりの値（msなら1000、秒なら1）
+    @return サンプリング周波数[Hz]（2行未満の場合はNaN）
+    """
+    if isinstance(data, pd.DataFrame):
+        data = data[column]
+    time = np.asarray(data, dtype=np.float64)
+    dt = np.diff(time)
+    dt = dt[np.isfinite(dt) & (dt > 0)]
+    if len(dt) == 0:
+        return np.nan
+    return time_scale / float(np.median(dt))
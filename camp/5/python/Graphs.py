@@ -1,11 +1,33 @@
+import logging
 import os
 
 import pandas as pd
 import numpy as np
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 from enum import Enum
 from typing import List
 
+from align import align_streams
+from compact import compact_frame
+from decimate import decimate
+from frame_cache import read_answer_csv, read_sensor_csv
+from frame_memo import FrameMemo
+from profiling import PipelineProfiler, stage
+from sampling import SamplingInfo, sampling_info
+from segments import SegmentIndex, break_at_gaps, find_segments
+from sensor_store import open_store, store_path
+from spectral import fft_features
+from stream_filters import moving_average
+from time_query import gather_time_ranges, time_range, time_ranges
+from window_stats import calc_window_stats
+from window_stream import iter_window_stats
+
+logger = logging.getLogger(__name__)
+
+# グラフを描く図の大きさ
+FIGURE_SIZE = (15, 25)
+
 
 class GraphViewOptions(Enum):
     low_filter = 'low_filter'
@@ -22,51 +44,169 @@ class GraphAxis(Enum):
     acc = 'acc'
 
 
+class GraphDecimation(Enum):
+    minmax = 'minmax'
+    lttb = 'lttb'
+    none = 'none'
+
+
+class SensorType(Enum):
+    acc = 'acc'
+    angular = 'Angular'
+    ble_char = 'BLE_isu'
+    ble_tent = 'BLE_tent'
+    heart_rate = 'HartRate'
+
+
+"""
+センサーのデータフレームを初めて参照したときに読み込むプロパティを作成する
+@param sensor センサーの種類
+@return プロパティ
+"""
+
+
+def sensor_property(sensor: SensorType) -> property:
+    def getter(self) -> pd.DataFrame:
+        return self.load(sensor)
+
+    def setter(self, df: pd.DataFrame) -> None:
+        # 差し替える前のデータフレームの区間の一覧は使えなくなる
+        if sensor in self.frames:
+            self.invalidate_segments(self.frames[sensor])
+        self.frames[sensor] = df
+
+    return property(getter, setter)
+
+
 class MakeGraph:
+    # センサーごとのデータフレーム（初めて参照したときにcsvを読み込む）
+    acc_df = sensor_property(SensorType.acc)
+    angular_df = sensor_property(SensorType.angular)
+    ble_char_df = sensor_property(SensorType.ble_char)
+    ble_tent_df = sensor_property(SensorType.ble_tent)
+    heart_rate_df = sensor_property(SensorType.heart_rate)
+
     """
     コンストラクタ
     @param folder_name フォルダ名
+    @param use_cache 読み込んだデータを../cache/以下にキャッシュするかどうか
+    @param sensors 使うセンサーの一覧（指定したものだけを最初に読み込み、それ以外は空のデータフレームになる）
+    @param profile 段階ごとの時間・行数を記録するかどうか（profile_report()で取り出す）
+    @param profile_memory 段階ごとのメモリも記録するかどうか（遅くなる）
+    @param compact 読み込んだ列を小さい型（float32, int32, int8など）にするかどうか（精度はcompact.compact_frameを参照）
+    @param use_store ../store/以下にバイナリ形式（sensor_store.py）のファイルがあれば、csvの代わりにそれを開くかどうか
     """
 
-    def __init__(self, folder_name):
+    def __init__(self, folder_name, use_cache: bool = True, sensors: List[SensorType] = None,
+                 profile: bool = False, profile_memory: bool = False, compact: bool = False,
+                 use_store: bool = False):
         self.folder_name = '../data/' + folder_name
         self.path = folder_name
         self.file_names = os.listdir(self.folder_name)
-
-        # 全てのファイルのデータフレームを作成
-        self.acc_df = pd.DataFrame()
-        self.angular_df = pd.DataFrame()
-        self.ble_char_df = pd.DataFrame()
-        self.ble_tent_df = pd.DataFrame()
-        self.heart_rate_df = pd.DataFrame()
+        self.cache_dir = '../cache/' + folder_name if use_cache else None
+        self.compact = compact
+        self.store_dir = '../store/' + folder_name if use_store else None
+
+        # 読み込み済みのデータフレーム
+        self.frames = {}
+        # データフレームごとの区間の一覧（(id, threshold) -> (参照, 行数と最初・最後の時刻, SegmentIndex)）
+        self.segment_cache = FrameMemo()
+        # ファイルに保存するときに使い回す図
+        self.export_figure = None
+        self.sensors = list(SensorType) if sensors is None else list(sensors)
+        # 段階ごとの計測（計測しない場合はNone）
+        self.profiler = PipelineProfiler(folder_name, memory=profile_memory) \
+            if profile or profile_memory else None
 
         # フォントサイズとフォントの設定
         plt.rcParams["font.size"] = 14
         plt.rcParams['font.family'] = "IPAexGothic"
 
-        for file_name in self.file_names:
-            # .DS_Storeを除外
-            if file_name == '.DS_Store':
-                continue
+        # 使うセンサーが指定された場合は最初にまとめて読み込む
+        if sensors is not None:
+            for sensor in self.sensors:
+                self.load(sensor)
+
+    """
+    センサーのデータフレームを読み込む
+    一度読み込んだものは保持しておき、二回目以降はそれを返す
+    @param sensor センサーの種類
+    @return データフレーム（ファイルが無い・使わないセンサーの場合は空のデータフレーム）
+    """
+
+    def load(self, sensor: SensorType) -> pd.DataFrame:
+        if sensor in self.frames:
+            return self.frames[sensor]
+
+        file_name = sensor.value + '.csv'
+        store = self.open_store(sensor) if sensor in self.sensors else None
+        if store is not None:
+            logger.info('%s: %s', self.path, store.path)
+            # メモリマップのビューをそのまま列にする（timeは保存時に0から始めてある）
+            # compact=Trueならcsvと同じく小さい型にする（その場合はメモリマップではなくコピーになる）
+            with stage(self.profiler, 'load:' + sensor.value) as record:
+                df_tmp = store.frame()
+                if self.compact:
+                    df_tmp = compact_frame(df_tmp)
+                record['rows'] = len(df_tmp)
+        elif sensor in self.sensors and file_name in self.file_names:
+            logger.info('%s: %s', self.path, file_name)
+            # 時間を0から始めたデータフレームを読み込む（キャッシュが有効ならそれを使う）
+            with stage(self.profiler, 'load:' + sensor.value) as record:
+                df_tmp = read_sensor_csv(os.path.join(self.folder_name, file_name), self.cache_dir,
+                                         profiler=self.profiler, compact=self.compact)
+                record['rows'] = len(df_tmp)
+        else:
+            df_tmp = pd.DataFrame()
+
+        self.frames[sensor] = df_tmp
+        return df_tmp
+
+    """
+    センサーのバイナリ形式のファイルを開く
+    @param sensor センサーの種類
+    @return SensorStore（use_store=Falseで作った場合・ファイルが無い場合はNone）
+    """
 
-            df_tmp = pd.read_csv(os.path.join(self.folder_name, file_name))
-            file_type = file_name.replace('.csv', '')
+    def open_store(self, sensor: SensorType):
+        if self.store_dir is None:
+            return None
+        return open_store(store_path(self.store_dir, sensor.value))
 
-            print(file_name)
-            # 時間を0から始める
-            df_tmp['time'] = (df_tmp['time'] - df_tmp['time'][0])
+    """
+    センサーのデータの一部の時間だけを読み込む
+    バイナリ形式のファイルがあれば、その範囲のレコードだけをメモリマップで開く（全体を読み込まない）
+    無ければ読み込み済みのデータフレームから切り出す
+    使わないセンサー（sensorsに含まれないもの）はloadと同じく空のデータフレームを返す
+    compact=Trueで作った場合はloadと同じく小さい型にする
+    @param sensor センサーの種類
+    @param start_time 開始時間 ms（0から始めた時間）
+    @param end_time 終了時間 ms（0から始めた時間）
+    @return 切り出したデータフレーム
+    """
 
-            match file_type:
-                case 'acc':
-                    self.acc_df = df_tmp
-                # case 'Angular':
-                #     self.angular_df = df_tmp
-                case 'BLE_isu':
-                    self.ble_char_df = df_tmp
-                case 'BLE_tent':
-                    self.ble_tent_df = df_tmp
-                # case 'HartRate':
-                #     self.heart_rate_df = df_tmp
+    def query(self, sensor: SensorType, start_time: float, end_time: float) -> pd.DataFrame:
+        if sensor not in self.sensors:
+            return self.load(sensor)
+        store = self.open_store(sensor) if sensor not in self.frames else None
+        if store is not None:
+            df = store.frame(start_time, end_time)
+            return compact_frame(df) if self.compact else df
+        df = self.load(sensor)
+        if len(df) == 0:
+            return df
+        return self.split_time(df, start_time, end_time)
+
+    """
+    ans.csv（ラベルの時刻と内容）を読み込む
+    compact=Trueで作った場合はcontentをcategoryにする
+    @return データフレーム（ファイルが無い場合は空のデータフレーム）
+    """
+
+    def load_answers(self) -> pd.DataFrame:
+        if 'ans.csv' not in self.file_names:
+            return pd.DataFrame()
+        return read_answer_csv(os.path.join(self.folder_name, 'ans.csv'), compact=self.compact)
 
     """
     normを計算する
@@ -81,7 +221,7 @@ class MakeGraph:
         return tmp_list
 
     """
-    ローパスフィルタ
+    ローパスフィルタ（移動平均、LowFilterStreamで少しずつ行っても同じ結果になる）
     @param list データフレーム
     @param window_size ウィンドウサイズ
     @return フィルタ後のデータフレーム
@@ -92,7 +232,7 @@ class MakeGraph:
         for column in low_filter_list:
             if column == 'time':
                 continue
-            low_filter_list[column] = low_filter_list[column].rolling(window_size).mean()
+            low_filter_list[column] = moving_average(low_filter_list[column].to_numpy(), window_size)
 
         return low_filter_list
 
@@ -116,23 +256,31 @@ class MakeGraph:
     @param axis 軸
     @param filter_num フィルタ数
     @param label_nameの名前
+    @param decimation 点の減らし方
+    @param max_points 1系列あたりの点の数の上限（Noneならグラフの横幅のピクセル数の2倍）
+    @param save_path 保存先のファイル（.png, .svgなど、指定すると表示せずにファイルに保存する）
+    @param gap この時間[ms]より長く記録が途切れたところで線を切る（Noneなら切らない）
     """
-    def ble_plot(self, plt_lists: [pd.DataFrame], axis: GraphAxis, filter_num: int,label_name: [str]) -> None:
-        fig = plt.figure(figsize=(15, 25))
-        fig.subplots_adjust(hspace=0.5)
-        ax = fig.add_subplot(5, 1, 1)
-
-        for index, list_val in enumerate(plt_lists):
-            ax.plot(list_val['time'], list_val['rssi'], label=label_name[index])
-        ax.legend()
-
-        # タイトル
-        ax.set_title(self.path + '_' + axis.value + '_' + "window=" + str(filter_num))
-        ax.set_xlabel('time [s]')
-        ax.set_ylabel('RSSI [dBm]')
-        ax.grid()
+    def ble_plot(self, plt_lists: [pd.DataFrame], axis: GraphAxis, filter_num: int,label_name: [str],
+                 decimation: GraphDecimation = GraphDecimation.minmax, max_points: int = None,
+                 save_path: str = None, gap: float = None) -> None:
+        with stage(self.profiler, 'ble_plot', rows=sum(len(list_val) for list_val in plt_lists)):
+            fig = self.__figure(save_path)
+            fig.subplots_adjust(hspace=0.5)
+            ax = fig.add_subplot(5, 1, 1)
+            max_points = self.__max_points(fig, max_points)
+
+            for index, list_val in enumerate(plt_lists):
+                ax.plot(*self.__series(list_val, 'rssi', max_points, decimation, gap), label=label_name[index])
+            ax.legend()
+
+            # タイトル
+            ax.set_title(self.path + '_' + axis.value + '_' + "window=" + str(filter_num))
+            ax.set_xlabel('time [s]')
+            ax.set_ylabel('RSSI [dBm]')
+            ax.grid()
 
-        plt.show()
+            self.__show(fig, save_path)
 
     """
     グラフを作成する
@@ -140,16 +288,88 @@ class MakeGraph:
     @param option オプション
     @param axis 軸
     @param filter_num フィルタ数
+    @param decimation 点の減らし方（minmax・lttbはピークを残したまま点を減らす）
+    @param max_points 1系列あたりの点の数の上限（Noneならグラフの横幅のピクセル数の2倍）
+    @param save_path 保存先のファイル（.png, .svgなど、指定すると表示せずにファイルに保存する）
+    @param gap この時間[ms]より長く記録が途切れたところで線を切る（Noneなら切らない）
     """
     def plot(self, plt_lists: List[pd.DataFrame], option: List[GraphViewOptions], axis: GraphAxis,
-             filter_num: int) -> None:
-        fig = plt.figure(figsize=(15, 25))
-        fig.subplots_adjust(hspace=0.5)
+             filter_num: int, decimation: GraphDecimation = GraphDecimation.minmax, max_points: int = None,
+             save_path: str = None, gap: float = None) -> None:
+        with stage(self.profiler, 'plot', rows=sum(len(list_val) for list_val in plt_lists)):
+            fig = self.__figure(save_path)
+            fig.subplots_adjust(hspace=0.5)
+            max_points = self.__max_points(fig, max_points)
+
+            for index, list_val in enumerate(plt_lists):
+                self.__ax(index=index, fig=fig, ax_list=list_val, option=option, axis=axis, filter_num=filter_num,
+                          decimation=decimation, max_points=max_points, gap=gap)
+
+            self.__show(fig, save_path)
+
+    """
+    グラフを描く図を用意する
+    ファイルに保存する場合はpyplotを使わない図を1つだけ作り、次からは中身を消して使い回す
+    （GUIが無い環境でも動き、図を毎回作り直さない）
+    @param save_path 保存先のファイル
+    @return 図
+    """
 
-        for index, list_val in enumerate(plt_lists):
-            self.__ax(index=index, fig=fig, ax_list=list_val, option=option, axis=axis, filter_num=filter_num)
+    def __figure(self, save_path: str) -> plt.Figure:
+        if save_path is None:
+            return plt.figure(figsize=FIGURE_SIZE)
 
-        plt.show()
+        if self.export_figure is None:
+            self.export_figure = Figure(figsize=FIGURE_SIZE)
+        self.export_figure.clf()
+        return self.export_figure
+
+    """
+    グラフを表示する、またはファイルに保存する
+    @param fig 図
+    @param save_path 保存先のファイル（Noneなら表示する）
+    """
+
+    def __show(self, fig: plt.Figure, save_path: str) -> None:
+        if save_path is None:
+            plt.show()
+            return
+
+        folder = os.path.dirname(save_path)
+        if folder != '':
+            os.makedirs(folder, exist_ok=True)
+        with stage(self.profiler, 'savefig'):
+            fig.savefig(save_path)
+
+    """
+    1系列あたりの点の数の上限を決める
+    描く点の数を画面の横幅に合わせるので、記録が長くなっても描画の時間は変わらない
+    @param fig 図
+    @param max_points 指定された上限（Noneならグラフの横幅のピクセル数の2倍）
+    @return 点の数の上限
+    """
+
+    def __max_points(self, fig: plt.Figure, max_points: int) -> int:
+        if max_points is not None:
+            return max_points
+        return int(fig.get_figwidth() * fig.dpi) * 2
+
+    """
+    グラフに描く1系列の点を用意する（点を減らし、途切れの位置で線を切る）
+    @param df データフレーム
+    @param column 列名
+    @param max_points 点の数の上限
+    @param decimation 点の減らし方
+    @param gap この時間より長く記録が途切れたところで線を切る（Noneなら切らない）
+    @return (時間の配列, 値の配列)
+    """
+
+    def __series(self, df: pd.DataFrame, column: str, max_points: int, decimation: GraphDecimation,
+                 gap: float) -> tuple:
+        x, y = decimate(df['time'], df[column], max_points, decimation.value)
+        if gap is None:
+            return x, y
+        return break_at_gaps(x, y, self.segments(df, gap))
 
     """
     matplotlibのaxを作成する
@@ -157,10 +377,13 @@ class MakeGraph:
     @param option オプション
     @param axis 軸
     @param filter_num フィルタ数
+    @param decimation 点の減らし方
+    @param max_points 1系列あたりの点の数の上限
+    @param gap この時間より長く記録が途切れたところで線を切る（Noneなら切らない）
     """
 
     def __ax(self, index: int, fig: plt.Figure, ax_list: pd.DataFrame, option: List[GraphViewOptions], axis: GraphAxis,
-             filter_num: int) -> None:
+             filter_num: int, decimation: GraphDecimation, max_points: int, gap: float = None) -> None:
         ax = fig.add_subplot(5, 1, index + 1)
 
         match axis:
@@ -168,13 +391,12 @@ class MakeGraph:
                 for column in ax_list:
                     if column == 'time':
                         continue
-                    ax.plot(ax_list['time'], ax_list[column], label=column)
+                    ax.plot(*self.__series(ax_list, column, max_points, decimation, gap), label=column)
             case _:  # GraphAxis.x, GraphAxis.y, GraphAxis.z, GraphAxis.rssi, GraphAxis.bpm
                 try:
-                    ax.plot(ax_list['time'], ax_list[axis.value], label=axis.value)
-                except:
-                    print('その軸は存在しません')
-                    pass
+                    ax.plot(*self.__series(ax_list, axis.value, max_points, decimation, gap), label=axis.value)
+                except KeyError:
+                    logger.warning('%s: その軸は存在しません: %s', self.path, axis.value)
         ax.legend()
 
         # タイトル
@@ -193,6 +415,7 @@ class MakeGraph:
 
     """
     時間でデータフレームを分割する
+    timeが昇順なら二分探索で位置を求めて、コピーせずに切り出す
     @param list データフレーム
     @param start_time 開始時間
     @param end_time 終了時間
@@ -201,9 +424,21 @@ class MakeGraph:
 
     def split_time(self, split_time_list: pd.DataFrame, start_time: int,
                    end_time: int) -> pd.DataFrame:
-        split_time_list = split_time_list[
-            (split_time_list['time'] >= start_time) & (split_time_list['time'] <= end_time)]
-        return split_time_list
+        return time_range(split_time_list, start_time, end_time)
+
+    """
+    複数の時間の範囲でデータフレームをまとめて分割する
+    @param list データフレーム（timeは昇順）
+    @param start_times 開始時間の配列
+    @param end_times 終了時間の配列
+    @param concat Trueなら範囲の番号の列（range）を付けて1つのデータフレームにまとめる
+    @return 範囲ごとのデータフレームのリスト（concat=Trueなら1つのデータフレーム）
+    """
+
+    def split_times(self, split_time_list: pd.DataFrame, start_times, end_times, concat: bool = False):
+        if concat:
+            return gather_time_ranges(split_time_list, start_times, end_times)
+        return time_ranges(split_time_list, start_times, end_times)
 
     """
     csvを出力する
@@ -217,43 +452,18 @@ class MakeGraph:
     """
     周波数成分を計算する
     @param list データフレーム
-    @param filter_num フィルタ数
+    @param filter_num ウィンドウサイズ（行数）
+    @param hop ウィンドウをずらす行数（Noneならfilter_numと同じ）
+    @param taper 窓関数の名前（hann, hamming, blackman, bartlett, boxcar, None）
+    @param gap この時間[ms]より長く記録が途切れたところをまたぐウィンドウは計算しない（Noneなら区切らない）
     @return 周波数成分のデータフレーム
     """
-    def __fft(self, fft_list: pd.DataFrame, filter_num: int) -> pd.DataFrame:
-        tmp_list = pd.DataFrame()
-
-        # window_sizeで指定した範囲で計算して、終わったら、次の範囲に移動する
-        for i in range(0, len(fft_list), filter_num):
-            for column in fft_list:
-                if column == 'time':
-                    continue
-                # FFTを計算
-
-                N = len(fft_list[column][i:i + filter_num])  # サンプル数
-                dt = 1 / self.calculate_sampling_frequency(fft_list[column][i:i + filter_num])  # サンプリング間隔
-
-                y_fft = np.fft.fft(fft_list[column][i:i + filter_num])  # 離散フーリエ変換
-                freq = np.fft.fftfreq(N, d=dt)  # 周波数を割り当てる（※後述）
-                Amp = abs(y_fft / (N / 2))  # 音の大きさ（振幅の大きさ）
-
-                # 最大の周波数成分のインデックスを取得
-                index = np.argmax(Amp[1:int(N / 2)])
-
-                # 最大の周波数成分を取得
-                tmp_list.loc[i, column + '_fft'] = freq[index]
-
-                # 最大の周波数成分の振幅を取得
-                tmp_list.loc[i, column + '_fft_amp'] = Amp[index]
-
-                # 最大の周波数成分の位相を取得
-                tmp_list.loc[i, column + '_fft_phase'] = np.angle(y_fft[index])
-
-                # 最大の周波数成分の周波数を取得
-                tmp_list.loc[i, column + '_fft_freq'] = freq[index] * self.calculate_sampling_frequency(fft_list[column][i:i + filter_num])
-
-
-        return tmp_list
+    def fft(self, fft_list: pd.DataFrame, filter_num: int, hop: int = None, taper: str = 'hann',
+            gap: float = None) -> pd.DataFrame:
+        segments = None if gap is None else self.segments(fft_list, gap)
+        # 軸ごとにウィンドウを並べて一度にFFTを行う
+        with stage(self.profiler, 'fft', rows=len(fft_list)):
+            return fft_features(fft_list, filter_num, hop=hop, taper=taper, segments=segments)
 
     """
     平均・分散・最大値・最小値・中央値・四分位数・標準偏差を計算する
@@ -263,74 +473,97 @@ class MakeGraph:
     @return 平均・分散・最大値・最小値・中央値・四分位数・標準偏差のデータフレーム
     """
     def calc(self, calc_list: pd.DataFrame, filter_num: int) -> pd.DataFrame:
-        tmp_list = pd.DataFrame()
+        # ウィンドウの区切りとギャップを一度に求めて、全ての軸の統計量をまとめて計算する
+        # 途切れの位置は区間の一覧から取り出す（同じデータフレームなら前回の結果を使う）
+        segments = self.segments(calc_list, filter_num)
+        with stage(self.profiler, 'calc', rows=len(calc_list)):
+            return calc_window_stats(calc_list, filter_num, segments=segments)
+    
 
-        start_time = calc_list['time'][0]
-        first_time = calc_list['time'][0] - start_time
-        first_index = 0
-        
-        
-        for column in calc_list:
-            if column == 'time':
-                    continue
-            
-            for i in range(0, len(calc_list)):
-                # print("first_time:" + str(first_time) + "first_index" + str(first_index) +  " time:" + str(calc_list["time"][i]) + " i:" + str(i))
-                print("first_time + filter_num:" + str(first_time + filter_num) + " first_time - calc_list[time][i]:" + str(calc_list["time"][i] - start_time))
-                
-
-                if i < len(calc_list) - 1 and calc_list["time"][i+1] - calc_list['time'][i] > filter_num:
-                    tmp_list.loc[i, column + '_mean'] = calc_list[column][first_index:i].mean()
-                    tmp_list.loc[i, column + '_std'] = calc_list[column][first_index:i].std()
-                    tmp_list.loc[i, column + '_min'] = calc_list[column][first_index:i].min()
-                    tmp_list.loc[i, column + '_25%'] = calc_list[column][first_index:i].quantile(0.25)
-                    tmp_list.loc[i, column + '_50%'] = calc_list[column][first_index:i].quantile(0.5)
-                    tmp_list.loc[i, column + '_75%'] = calc_list[column][first_index:i].quantile(0.75)
-                    tmp_list.loc[i, column + '_max'] = calc_list[column][first_index:i].max()
-                    tmp_list.loc[i, column + '_first_time'] = first_time
-                    tmp_list.loc[i, column + '_finish_time'] = calc_list["time"][i] - start_time
-
-                    tmp_list.loc[i+1, column + '_mean'] = 0
-                    tmp_list.loc[i+1, column + '_std'] = 0
-                    tmp_list.loc[i+1, column + '_min'] = 0
-                    tmp_list.loc[i+1, column + '_25%'] = 0
-                    tmp_list.loc[i+1, column + '_50%'] = 0
-                    tmp_list.loc[i+1, column + '_75%'] = 0
-                    tmp_list.loc[i+1, column + '_max'] = 0
-                    tmp_list.loc[i+1, column + '_first_time'] = calc_list["time"][i] - start_time
-                    tmp_list.loc[i+1, column + '_finish_time'] = calc_list["time"][i+1] - start_time
-
-                    first_time = calc_list["time"][i+1] - start_time
-                    first_index = i+1
-                    continue
-
-                
-                if first_time + filter_num > calc_list["time"][i] - start_time:
-                    if i != len(calc_list) - 1:
-                        continue
-                
-                # 平均、標準偏差、最小値、第1四分位数、中央値（第2四分位数）、第3四分位数、最大値などを計算する
-                tmp_list.loc[i, column + '_mean'] = calc_list[column][first_index:i].mean()
-                tmp_list.loc[i, column + '_std'] = calc_list[column][first_index:i].std()
-                tmp_list.loc[i, column + '_min'] = calc_list[column][first_index:i].min()
-                tmp_list.loc[i, column + '_25%'] = calc_list[column][first_index:i].quantile(0.25)
-                tmp_list.loc[i, column + '_50%'] = calc_list[column][first_index:i].quantile(0.5)
-                tmp_list.loc[i, column + '_75%'] = calc_list[column][first_index:i].quantile(0.75)
-                tmp_list.loc[i, column + '_max'] = calc_list[column][first_index:i].max()
-                tmp_list.loc[i, column + '_first_time'] = first_time
-                tmp_list.loc[i, column + '_finish_time'] = calc_list["time"][i] - start_time
-
-
-                first_time = calc_list["time"][i] - start_time
-                first_index = i
+    """
+    記録が途切れずに続いている区間の一覧を返す
+    データフレームごとに一度だけ求めて保持し、行数や最初・最後の時刻が変わっていれば求め直す
+    途中の行のtimeをその場で書き換えた場合は検出できないので、invalidate_segmentsを呼ぶ
+    @param data データフレーム、またはセンサーの種類
+    @param threshold これより長い時間差[ms]を途切れとみなす
+    @return SegmentIndex
+    """
+    def segments(self, data, threshold: float) -> SegmentIndex:
+        df = self.load(data) if isinstance(data, SensorType) else data
+        time = df['time'].to_numpy()
 
-        return tmp_list
-    
+        def compute() -> SegmentIndex:
+            with stage(self.profiler, 'segments', rows=len(time)):
+                return find_segments(time, threshold)
+
+        return self.segment_cache.get(df, time, compute, threshold)
+
+    """
+    データフレームの区間の一覧を捨てる（データフレームを書き換えたときに使う）
+    @param df データフレーム
+    """
+    def invalidate_segments(self, df: pd.DataFrame) -> None:
+        self.segment_cache.invalidate(df)
+
+    """
+    センサーのcsvを少しずつ読み込みながら、calcと同じ統計量を確定したウィンドウから順に返す
+    データフレーム全体を読み込まないので、長い記録でもメモリは一定
+    @param sensor センサーの種類
+    @param filter_num ms
+    @param chunksize 一度に読み込む行数
+    @return ウィンドウの統計量のデータフレームを返すジェネレータ
+    """
+    def calc_stream(self, sensor: SensorType, filter_num: int, chunksize: int = 100000):
+        file_path = os.path.join(self.folder_name, sensor.value + '.csv')
+        return iter_window_stats(file_path, filter_num, chunksize=chunksize)
+
+    """
+    複数のセンサーのデータを共通の時間軸に並べて、1つのデータフレームにする
+    センサーごとに0から始めた時間を元の時刻に戻してから合わせる
+    BLEの時刻は他のセンサーと基準が違うので、acc・Angular・HartRateと一緒に合わせても意味が無い
+    @param sensors センサーの一覧
+    @param step 共通の時間軸の間隔 ms
+    @param fill 補間の方法（linear, ffill, nearest、センサーごとに変える場合は SensorType -> 補間の方法）
+    @param tolerance 使うサンプルとの時間差の上限 ms（センサーごとに変える場合は SensorType -> 上限）
+    @param how inner: 全てのセンサーが記録している範囲, outer: いずれかのセンサーが記録している範囲
+    @return timeと「センサー名_列名」（acc_x, heart_rate_bpm, ...）の列を持つデータフレーム
+    """
+    def align(self, sensors: List[SensorType], step: float, fill='linear', tolerance=None,
+              how: str = 'inner') -> pd.DataFrame:
+        streams = {sensor.name: self.load(sensor) for sensor in sensors}
+        origins = {name: df.attrs.get('time_origin', 0) for name, df in streams.items()}
+        if isinstance(fill, dict):
+            fill = {sensor.name: value for sensor, value in fill.items()}
+        if isinstance(tolerance, dict):
+            tolerance = {sensor.name: value for sensor, value in tolerance.items()}
+        return align_streams(streams, step, fill=fill, tolerance=tolerance, how=how, origins=origins)
+
+    """
+    段階ごとの計測結果を返す
+    @param file_path 保存先のjsonファイル（Noneなら保存しない）
+    @return セッション名、全ての段階の記録、段階ごとの合計（profile=Falseで作った場合はNone）
+    """
+    def profile_report(self, file_path: str = None) -> dict | None:
+        if self.profiler is None:
+            return None
+        if file_path is not None:
+            self.profiler.to_json(file_path)
+        return self.profiler.report()
 
     """
     サンプリング周波数を計算する
+    timeの間隔の中央値から求めるので、記録の途切れやフィルタで抜けた行があってもずれない
+    @param data データフレーム（timeはms）
+    @return サンプリング周波数[Hz]
+    """
+    def calculate_sampling_frequency(self, data: pd.DataFrame) -> float:
+        return self.sampling_info(data).frequency
+
+    """
+    サンプリング周波数・間隔の中央値・ジッター・ギャップを求める
+    同じデータフレームに対しては前回の結果を返す
+    @param data データフレーム、timeのSeries、またはcsvファイルのパス
+    @return SamplingInfo
     """
-    def calculate_sampling_frequency(self,data: pd.DataFrame) -> float:
-        time_interval = data["time"][len(data)-1] - data["time"][0]
-        sampling_frequency = 1 / (time_interval / len(data))
-        return sampling_frequency
+    def sampling_info(self, data) -> SamplingInfo:
+        return sampling_info(data)
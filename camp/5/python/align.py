@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# 補間の方法
+#   linear: 前後のサンプルから線形補間する
+#   ffill: 直前のサンプルの値を使う
+#   nearest: 一番近いサンプルの値を使う
+FILL_POLICIES = ('linear', 'ffill', 'nearest')
+
+
+def resample_stream(resample_list: pd.DataFrame, grid: np.ndarray, fill: str = 'linear',
+                    tolerance: float | None = None, time: np.ndarray | None = None) -> dict:
+    """
+    1つのセンサーのデータを共通の時間軸に合わせる
+    時間は昇順に並んでいるので、二分探索（as-of結合）で前後のサンプルをまとめて求める
+    @param resample_list データフレーム
+    @param grid 共通の時間軸
+    @param fill 補間の方法（linear, ffill, nearest）
+    @param tolerance 使うサンプルとの時間差の上限（linearは前後のサンプルの間隔の上限、Noneなら制限しない）
+    @param time resample_listの時間（Noneならtime列を使う）
+    @return 列名 -> 共通の時間軸での値
+    """
+    if fill not in FILL_POLICIES:
+        raise ValueError('fillは ' + ', '.join(FILL_POLICIES) + ' のどれかを指定してください: ' + str(fill))
+    if time is None:
+        time = resample_list['time'].to_numpy(dtype=np.float64)
+    columns = [column for column in resample_list if column != 'time']
+    if len(time) == 0:
+        return {column: np.full(len(grid), np.nan) for column in columns}
+
+    # 各時刻の直前（以下）と直後のサンプルの位置
+    after = np.searchsorted(time, grid, side='right')
+    before = after - 1
+    has_before = before >= 0
+    has_after = after < len(time)
+    before_clip = np.clip(before, 0, len(time) - 1)
+    after_clip = np.clip(after, 0, len(time) - 1)
+    dist_before = np.where(has_before, grid - time[before_clip], np.inf)
+    dist_after = np.where(has_after, time[after_clip] - grid, np.inf)
+
+    if fill == 'linear':
+        # 最後のサンプルと同じ時刻はそのサンプルの値を使えるようにする
+        valid = has_before & (has_after | (dist_before == 0))
+        if tolerance is not None:
+            valid &= (dist_before == 0) | (dist_before + dist_after <= tolerance)
+    elif fill == 'ffill':
+        index = before_clip
+        valid = has_before
+        if tolerance is not None:
+            valid &= dist_before <= tolerance
+    else:
+        use_after = dist_after < dist_before
+        index = np.where(use_after, after_clip, before_clip)
+        valid = has_before | has_after
+        if tolerance is not None:
+            valid &= np.minimum(dist_before, dist_after) <= tolerance
+
+    resampled = {}
+    for column in columns:
+        values = pd.to_numeric(resample_list[column], errors='coerce').to_numpy(dtype=np.float64)
+        if fill == 'linear':
+            out = np.interp(grid, time, values)
+        else:
+            out = values[index]
+        out[~valid] = np.nan
+        resampled[column] = out
+    return resampled
+
+
+def align_streams(streams: dict, step: float, fill: str | dict = 'linear', tolerance: float | dict | None = None,
+                  how: str = 'inner', dtype=np.float32, origins: dict | None = None) -> pd.DataFrame:
+    """
+    複数のセンサーのデータを共通の時間軸に並べて、1つの横長のデータフレームにする
+    @param streams 名前 -> データフレーム
+    @param step 共通の時間軸の間隔（timeと同じ単位）
+    @param fill 補間の方法（全て同じにする場合は文字列、センサーごとに変える場合は 名前 -> 補間の方法）
+    @param tolerance 使うサンプルとの時間差の上限（数値、または 名前 -> 上限）
+    @param how inner: 全てのセンサーが記録している範囲, outer: いずれかのセンサーが記録している範囲
+    @param dtype 値の型（float32にするとメモリが半分になる）
+    @param origins 名前 -> timeに足す値（センサーごとに0から始めた時間を元の時刻に戻すのに使う）
+    @return timeと「名前_列名」の列を持つデータフレーム（timeは共通の時間軸の始まりからの経過時間）
+    """
+    if how not in ('inner', 'outer'):
+        raise ValueError('howは inner か outer を指定してください: ' + str(how))
+
+    times = {}
+    for name, df in streams.items():
+        if len(df) == 0:
+            continue
+        origin = 0 if origins is None else origins.get(name, 0)
+        times[name] = df['time'].to_numpy(dtype=np.float64) + origin
+
+    if not times:
+        return pd.DataFrame({'time': np.empty(0)})
+
+    starts = [time[0] for time in times.values()]
+    ends = [time[-1] for time in times.values()]
+    start, end = (max(starts), min(ends)) if how == 'inner' else (min(starts), max(ends))
+    grid = start + np.arange(max(int(np.floor((end - start) / step)) + 1, 0)) * step
+
+    aligned = {'time': grid - start}
+    for name, time in times.items():
+        stream_fill = fill.get(name, 'linear') if isinstance(fill, dict) else fill
+        stream_tolerance = tolerance.get(name) if isinstance(tolerance, dict) else tolerance
+        resampled = resample_stream(streams[name], grid, stream_fill, stream_tolerance, time=time)
+        for column, values in resampled.items():
+            aligned[name + '_' + column] = values.astype(dtype)
+
+    aligned_df = pd.DataFrame(aligned)
+    aligned_df.attrs['time_origin'] = start
+    return aligned_df
@@ -0,0 +1,249 @@
+import argparse
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# 計測する処理
+OPERATIONS = ['load', 'load_cached', 'norm', 'low_filter', 'diff', 'split_time', 'calc', 'fft']
+
+
+def generate_session(rows: int, rate: float = 25.0, seed: int = 0) -> dict:
+    """
+    センサーのデータを乱数で作る（同じseedなら同じデータになる）
+    acc・Angularはrate Hz、HartRateは約0.5 Hz、BLEは約1 Hzで不規則に記録したものとする
+    @param rows acc・Angularの行数
+    @param rate acc・Angularのサンプリング周波数 Hz
+    @param seed 乱数のシード
+    @return ファイルの種類 -> データフレーム
+    """
+    rng = np.random.default_rng(seed)
+    start = 1688978795000
+    dt = 1000 / rate
+
+    # 時間は少し揺らぎを持たせ、ときどき記録が途切れるようにする
+    steps = dt + rng.normal(0, dt * 0.05, rows)
+    steps[rng.random(rows) < 0.0005] += 5000
+    time_ms = start + np.cumsum(np.abs(steps)).astype(np.int64)
+    seconds = (time_ms - start) / 1000
+
+    def motion(scale: float) -> pd.DataFrame:
+        return pd.DataFrame({
+            'time': time_ms,
+            'x': scale * np.sin(2 * np.pi * 1.5 * seconds) + rng.normal(0, 0.3, rows),
+            'y': scale * np.sin(2 * np.pi * 0.7 * seconds) + rng.normal(0, 0.3, rows),
+            'z': scale * np.cos(2 * np.pi * 2.3 * seconds) + rng.normal(0, 0.3, rows),
+        })
+
+    duration = time_ms[-1] - start
+    heart_rows = max(int(duration / 2000), 2)
+    ble_rows = max(int(duration / 1000), 2)
+
+    def ble() -> pd.DataFrame:
+        ble_time = np.sort(rng.integers(0, duration, ble_rows)) + 1056651358
+        return pd.DataFrame({'time': ble_time, 'rssi': rng.integers(-100, -40, ble_rows)})
+
+    return {
+        'acc': motion(1.0),
+        'Angular': motion(2.0),
+        'HartRate': pd.DataFrame({
+            'time': start + np.linspace(0, duration, heart_rows).astype(np.int64),
+            'bpm': np.round(80 + 10 * np.sin(np.linspace(0, 20, heart_rows)) + rng.normal(0, 2, heart_rows)),
+        }),
+        'BLE_isu': ble(),
+        'BLE_tent': ble(),
+    }
+
+
+def write_session(session: dict, folder: str) -> None:
+    """generate_sessionのデータをセッションのフォルダにcsvで保存する"""
+    os.makedirs(folder, exist_ok=True)
+    for file_type, df in session.items():
+        df.to_csv(os.path.join(folder, file_type + '.csv'), index=False)
+
+
+def load_graphs(graphs_dir: str):
+    """指定したフォルダのGraphs.pyを読み込む（camp/4, camp/5, study/mahjanを比べるため）"""
+    graphs_dir = os.path.abspath(graphs_dir)
+    sys.path.insert(0, graphs_dir)
+    spec = importlib.util.spec_from_file_location('bench_graphs', os.path.join(graphs_dir, 'Graphs.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_graph(module, folder_name: str, use_cache: bool = False):
+    """
+    MakeGraphを作る
+    forkによって、フォルダ名に../data/を付けるものと付けないもの、キャッシュのあるものと無いものがある
+    """
+    kwargs = {}
+    if 'use_cache' in inspect.signature(module.MakeGraph.__init__).parameters:
+        kwargs['use_cache'] = use_cache
+    try:
+        graph = module.MakeGraph(folder_name, **kwargs)
+    except FileNotFoundError:
+        graph = module.MakeGraph(os.path.join('..', 'data', folder_name), **kwargs)
+    # 遅延読み込みのforkでも読み込みまで計測する
+    graph.acc_df
+    return graph
+
+
+def measure(func, setup=None, repeat: int = 3) -> tuple:
+    """
+    処理の時間（最小値）とピークのメモリを計測する
+    時間はtracemallocを止めた状態で計測し、メモリは別に1回だけ計測する
+    @param func 計測する処理（setupの戻り値を引数に取る）
+    @param setup 計測の前に毎回行う準備（計測には含めない）
+    @param repeat 繰り返す回数
+    @return (秒, ピークのメモリ MB)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+
+    arg = setup() if setup is not None else None
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024
+
+
+def run_benchmark(graphs_dir: str, sizes: list, operations: list = OPERATIONS, rate: float = 25.0,
+                  window_ms: int = 1000, repeat: int = 3, seed: int = 0) -> list:
+    """
+    大きさごとに合成データを作り、Graphs.pyの処理を計測する
+    @param graphs_dir Graphs.pyのあるフォルダ
+    @param sizes accの行数の一覧
+    @param operations 計測する処理の一覧
+    @param rate サンプリング周波数 Hz
+    @param window_ms calcのウィンドウの長さ ms（camp/4のcalcは行数なので、同じ時間の行数に直す）
+    @param repeat 繰り返す回数
+    @param seed 乱数のシード
+    @return 計測結果の一覧
+    """
+    module = load_graphs(graphs_dir)
+    work_dir = tempfile.mkdtemp(prefix='graphs_benchmark_')
+    cwd = os.getcwd()
+    results = []
+    try:
+        os.makedirs(os.path.join(work_dir, 'python'))
+        os.chdir(os.path.join(work_dir, 'python'))
+
+        for rows in sizes:
+            folder_name = 'bench_' + str(rows)
+            write_session(generate_session(rows, rate=rate, seed=seed), os.path.join('..', 'data', folder_name))
+            graph = make_graph(module, folder_name)
+            acc_df = graph.acc_df
+            time_column = acc_df['time']
+            middle = (time_column.iloc[0] + time_column.iloc[-1]) / 2
+            fft = getattr(graph, 'fft', None) or getattr(graph, '_MakeGraph__fft')
+            # ms単位のforkはそのまま、秒単位のforkは行数で渡す
+            filter_num = window_ms if time_column.iloc[-1] > rows else int(window_ms * rate / 1000)
+            fft_window = int(window_ms * rate / 1000)
+
+            cases = {
+                'load': (lambda _: make_graph(module, folder_name), None),
+                'load_cached': (lambda _: make_graph(module, folder_name, use_cache=True), None),
+                'norm': (lambda _: graph.norm(acc_df), None),
+                'low_filter': (lambda df: graph.low_filter(df, 10), acc_df.copy),
+                'diff': (lambda df: graph.diff(df), acc_df.copy),
+                'split_time': (lambda _: graph.split_time(acc_df, middle, middle + (middle - time_column.iloc[0]) / 10),
+                               None),
+                'calc': (lambda _: graph.calc(acc_df, filter_num), None),
+                'fft': (lambda _: fft(acc_df, fft_window), None),
+            }
+
+            for operation in operations:
+                if operation == 'load_cached':
+                    if 'use_cache' not in inspect.signature(module.MakeGraph.__init__).parameters:
+                        continue
+                    # 1回目でキャッシュを作っておく
+                    make_graph(module, folder_name, use_cache=True)
+                func, setup = cases[operation]
+                seconds, peak_mb = measure(func, setup, repeat=repeat)
+                result = {
+                    'operation': operation,
+                    'rows': rows,
+                    'seconds': seconds,
+                    'rows_per_second': rows / seconds if seconds > 0 else float('inf'),
+                    'peak_mb': peak_mb,
+                }
+                print('{operation:>12} {rows:>10} rows {seconds:10.4f} s {rows_per_second:14.0f} rows/s '
+                      '{peak_mb:10.1f} MB'.format(**result))
+                results.append(result)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float = 0.2) -> list:
+    """
+    基準の結果と比べて、遅くなった処理を返す
+    @param results 今回の結果
+    @param baseline 基準の結果
+    @param tolerance 許容する遅れの割合（0.2なら1.2倍まで）
+    @return (処理, 行数, 基準の秒, 今回の秒, 比) の一覧
+    """
+    baseline_seconds = {(result['operation'], result['rows']): result['seconds'] for result in baseline}
+    regressions = []
+    for result in results:
+        key = (result['operation'], result['rows'])
+        if key not in baseline_seconds or baseline_seconds[key] <= 0:
+            continue
+        ratio = result['seconds'] / baseline_seconds[key]
+        print('{:>12} {:>10} rows x{:.2f}'.format(key[0], key[1], ratio))
+        if ratio > 1 + tolerance:
+            regressions.append((key[0], key[1], baseline_seconds[key], result['seconds'], ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Graphs.pyの処理を合成データで計測する')
+    parser.add_argument('--graphs', default=os.path.dirname(os.path.abspath(__file__)), help='Graphs.pyのあるフォルダ')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10_000, 100_000, 1_000_000], help='accの行数')
+    parser.add_argument('--operations', nargs='*', default=OPERATIONS, help='計測する処理')
+    parser.add_argument('--rate', type=float, default=25.0, help='サンプリング周波数 Hz')
+    parser.add_argument('--window', type=int, default=1000, help='calc・fftのウィンドウの長さ ms')
+    parser.add_argument('--repeat', type=int, default=3, help='繰り返す回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード')
+    parser.add_argument('--output', default=None, help='結果を保存するjsonファイル')
+    parser.add_argument('--baseline', default=None, help='比べる基準の結果のjsonファイル')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='許容する遅れの割合')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.graphs, args.sizes, operations=args.operations, rate=args.rate,
+                            window_ms=args.window, repeat=args.repeat, seed=args.seed)
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({
+                'graphs': os.path.abspath(args.graphs),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'results': results,
+            }, file, ensure_ascii=False, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            for operation, rows, before, after, ratio in regressions:
+                print('遅くなった処理: {} {} rows {:.4f} s -> {:.4f} s (x{:.2f})'.format(operation, rows, before, after, ratio))
+            sys.exit(1)
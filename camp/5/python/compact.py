@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# int32にするtimeの範囲の上限 ms（約12日、ウィンドウの長さを足しても桁あふれしないように2^31の半分にする）
+COMPACT_TIME_LIMIT = 2 ** 30
+# float32にする列
+FLOAT_COLUMNS = ['x', 'y', 'z', 'bpm']
+
+
+def _smallest_int(values: np.ndarray, dtypes: list) -> np.ndarray | None:
+    """
+    値が全て整数で、dtypesのどれかに収まるなら、収まる最も小さい型に変換する
+    @param values 値の配列
+    @param dtypes 試す整数の型（小さい順）
+    @return 変換した配列（収まらない・整数でない値がある場合はNone）
+    """
+    if len(values) == 0:
+        return values.astype(dtypes[0])
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all() or not (values == np.round(values)).all():
+            return None
+    elif values.dtype.kind not in 'iu':
+        return None
+
+    low, high = values.min(), values.max()
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return None
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    データフレームの列を小さい型に変換する（メモリがおよそ半分になる）
+    精度の保証:
+      - x, y, z, bpm: float32（有効数字は約7桁で、センサーのcsvの値の桁数なら相対誤差は1e-7程度）
+      - time: 0から始めたmsがCOMPACT_TIME_LIMIT（約12日）未満の整数ならint32で、値は変わらない
+      - rssi: 全て整数ならint8、int8に収まらなければint16で、値は変わらない
+      - content: category（文字列の値は変わらない）
+    条件を満たさない列（NaNを含むtime・rssiなど）はそのままにする
+    @param df データフレーム
+    @return 変換したデータフレーム
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in FLOAT_COLUMNS and pd.api.types.is_numeric_dtype(values):
+            values = values.astype(np.float32)
+        elif column == 'time' and pd.api.types.is_numeric_dtype(values):
+            time = values.to_numpy()
+            if len(time) == 0 or np.abs(time).max() < COMPACT_TIME_LIMIT:
+                converted = _smallest_int(time, [np.int32])
+                if converted is not None:
+                    values = pd.Series(converted, index=df.index)
+        elif column == 'rssi' and pd.api.types.is_numeric_dtype(values):
+            converted = _smallest_int(values.to_numpy(), [np.int8, np.int16])
+            if converted is not None:
+                values = pd.Series(converted, index=df.index)
+        elif column == 'content':
+            values = values.astype('category')
+        columns[column] = values
+
+    compacted = pd.DataFrame(columns, index=df.index)
+    compacted.attrs = dict(df.attrs)
+    return compacted
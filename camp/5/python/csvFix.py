@@ -1,25 +1,123 @@
-import csv
-from datetime import datetime
+import argparse
+import fnmatch
+import logging
+import os
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 
-input_file = "camp/5/data/ans.csv"
-output_file = "camp/5/data/ans.csv"
+import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 datetime_format = "%Y-%m-%dT%H:%M:%S.%fZ"
 
-with open(input_file, "r", newline="") as file:
-    reader = csv.DictReader(file)
-    rows = list(reader)
+# アプリが出力する時刻は末尾にZが付いているが、実際は日本時間
+# （これまでのcsvFix.pyは日本時間のPCでdatetime.timestamp()を使って変換していたので、それと同じ結果にする）
+default_timezone = "Asia/Tokyo"
+
+
+def to_epoch_ms(time: pd.Series, timezone: str = default_timezone) -> pd.Series:
+    """
+    ISO 8601の時刻の列をまとめてUNIX時間（ms）に変換する
+    @param time 時刻の文字列の列
+    @param timezone 時刻のタイムゾーン
+    @return UNIX時間（ms）の列
+    """
+    datetime_obj = pd.to_datetime(time, format=datetime_format).dt.tz_localize(timezone)
+    return (datetime_obj - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)
+
+
+def convert_file(file_path: str, timezone: str = default_timezone, output_path: str = None) -> bool:
+    """
+    csvのtime列をUNIX時間（ms）に変換して上書きする（output_pathを指定した場合はそこに保存する）
+    time列が無いファイルや、先頭の行のtimeが既に数値になっているファイルは変更しない
+    一時ファイルに書き込んでから置き換えるので、途中で止まっても元のファイルは壊れない
+    @param file_path csvファイルのパス
+    @param timezone 時刻のタイムゾーン
+    @param output_path 保存先のパス（Noneならfile_pathを上書きする）
+    @return 変換したかどうか
+    """
+    # 先頭の行だけ読み込んで、変換が必要かどうかを判定する（センサーのcsvは大きいので全部は読まない）
+    head = pd.read_csv(file_path, dtype=str, keep_default_na=False, nrows=1, encoding='utf-8')
+    if 'time' not in head.columns or len(head) == 0:
+        return False
+    if pd.to_numeric(head['time'], errors='coerce').notna().all():
+        return False
+
+    # time以外の列はそのまま書き戻すため、全て文字列として読み込む
+    df = pd.read_csv(file_path, dtype=str, keep_default_na=False, encoding='utf-8')
+    df['time'] = to_epoch_ms(df['time'], timezone)
+
+    output_path = file_path if output_path is None else output_path
+    fd, tmp_path = tempfile.mkstemp(suffix='.csv', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+            df.to_csv(file, index=False)
+        os.chmod(tmp_path, os.stat(file_path).st_mode)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return True
+
+
+def try_convert_file(args: tuple) -> tuple:
+    """convert_fileを実行し、失敗した場合は例外を止めずにエラー内容を返す"""
+    file_path, timezone = args
+    try:
+        return file_path, convert_file(file_path, timezone), None
+    except Exception:
+        return file_path, False, traceback.format_exc()
+
+
+def find_files(roots: list, pattern: str) -> list:
+    """フォルダ以下のpatternに一致するファイルを名前順に返す"""
+    file_paths = []
+    for root in roots:
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in fnmatch.filter(file_names, pattern):
+                file_paths.append(os.path.join(dir_path, file_name))
+    return sorted(file_paths)
+
+
+def convert_all(roots: list, pattern: str = '*.csv', timezone: str = default_timezone, workers: int = 1) -> dict:
+    """
+    フォルダ以下の全てのcsvの時刻を変換する
+    @param roots 探すフォルダの一覧
+    @param pattern ファイル名のパターン
+    @param timezone 時刻のタイムゾーン
+    @param workers 並列に処理するプロセス数
+    @return ファイルのパス -> エラー内容（失敗したファイルのみ）
+    """
+    tasks = [(file_path, timezone) for file_path in find_files(roots, pattern)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(try_convert_file, tasks, chunksize=16))
+    else:
+        results = [try_convert_file(task) for task in tasks]
+
+    errors = {}
+    for file_path, converted, error in results:
+        if error is not None:
+            logger.error('%s\n%s', file_path, error)
+            errors[file_path] = error
+        elif converted:
+            logger.info('%s', file_path)
+    return errors
 
-    for row in rows:
-        datetime_str = row["time"]
-        datetime_obj = datetime.strptime(datetime_str, datetime_format)
-        absolute_time_ms = int(datetime_obj.timestamp() * 1000)
-        row["time"] = absolute_time_ms
 
-with open(output_file, "w", newline="") as file:
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(file, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(rows)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='csvのtime列をISO 8601からUNIX時間（ms）に変換する')
+    parser.add_argument('roots', nargs='*', default=['camp'], help='探すフォルダ')
+    parser.add_argument('--pattern', default='*.csv', help='ファイル名のパターン')
+    parser.add_argument('--timezone', default=default_timezone, help='時刻のタイムゾーン')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列に処理するプロセス数')
+    parser.add_argument('--log-level', default='INFO', help='ログの出力レベル（DEBUG, INFO, WARNINGなど）')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
 
-print("変換が完了しました。")
\ No newline at end of file
+    errors = convert_all(args.roots, pattern=args.pattern, timezone=args.timezone, workers=args.workers)
+    if errors:
+        logger.error('失敗したファイル: %s', ', '.join(errors))
+    logger.info('変換が完了しました。')
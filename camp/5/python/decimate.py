@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    データを区間に分けて、区間ごとの最小値と最大値の位置だけを残す
+    ピークは必ず残るので、グラフの見た目はほとんど変わらない
+    @param y 値の配列
+    @param n_out 残す点の数の上限
+    @return 残す点の位置（昇順）
+    """
+    n = len(y)
+    if n <= n_out or n <= 2:
+        return np.arange(n)
+    if n_out < 4:
+        # 区間の最小値・最大値と両端を残すには4点必要なので、両端（n_out=3なら最大値の位置も）だけを残す
+        ends = np.array([0, n - 1])[:max(n_out, 0)]
+        if n_out < 3:
+            return ends
+        return np.unique(np.append(ends, np.argmax(np.where(np.isnan(y), -np.inf, y))))
+    # 両端の2点を除いた残りを、区間ごとの最小値と最大値の2点ずつに使う
+    buckets = (n_out - 2) // 2
+
+    # 区間の大きさを揃えるため、足りない分はNaNで埋めて(区間数, 区間の大きさ)に並べる
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    low = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1) + offsets
+    high = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1) + offsets
+
+    indices = np.unique(np.concatenate([[0, n - 1], low, high]))
+    return indices[indices < n]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB（Largest-Triangle-Three-Buckets）で残す点を選ぶ
+    区間ごとに、前に選んだ点と次の区間の平均とで作る三角形が最大になる点を残す
+    @param x 時間の配列
+    @param y 値の配列
+    @param n_out 残す点の数
+    @return 残す点の位置（昇順）
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 最初と最後の点は必ず残し、その間をn_out - 2個の区間に分ける
+    edges = (np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+
+    # 区間ごとの平均は累積和からまとめて求める
+    valid = ~np.isnan(y)
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(np.where(valid, y, 0.0))])
+    cum_n = np.concatenate([[0], np.cumsum(valid)])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        count = max(cum_n[next_end] - cum_n[next_start], 1)
+        mean_x = (cum_x[next_end] - cum_x[next_start]) / (next_end - next_start)
+        mean_y = (cum_y[next_end] - cum_y[next_start]) / count
+
+        area = np.abs((x[selected] - mean_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (mean_y - y[selected]))
+        selected = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+def decimate(x: np.ndarray, y: np.ndarray, n_out: int, method: str = 'minmax') -> tuple:
+    """
+    グラフに描く点の数をn_out個程度まで減らす
+    @param x 時間の配列
+    @param y 値の配列
+    @param n_out 残す点の数
+    @param method minmax, lttb, none のどれか
+    @return (減らした後の時間の配列, 減らした後の値の配列)
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    match method:
+        case 'minmax':
+            indices = minmax_indices(y, n_out)
+        case 'lttb':
+            indices = lttb_indices(x, y, n_out)
+        case 'none':
+            return x, y
+        case _:
+            raise ValueError('methodは minmax, lttb, none のどれかを指定してください: ' + str(method))
+    return x[indices], y[indices]
@@ -0,0 +1,173 @@
+import argparse
+import logging
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# GUIを使わずにファイルに描画する
+matplotlib.use('Agg')
+
+from matplotlib.figure import Figure
+
+from Graphs import FIGURE_SIZE, MakeGraph, GraphAxis, GraphViewOptions
+
+logger = logging.getLogger(__name__)
+
+# 出力する図の種類
+FIGURES = ['acc', 'angular', 'heart_rate', 'ble']
+
+# ワーカーのプロセスごとに読み込み済みのMakeGraph（同じセッションの図を続けて描くときに読み込み直さない）
+# 保持するのは今のセッションの1つだけで、次のセッションに移ったら前のものは捨てる
+make_graphs = {}
+# ワーカーのプロセスごとに1つだけ作り、全てのセッションの図で使い回す図（_init_workerで作る）
+_worker_figure = {}
+
+
+def _init_worker() -> None:
+    _worker_figure['figure'] = Figure(figsize=FIGURE_SIZE)
+
+
+def session_folder_names() -> list:
+    """../data/以下のセッションのフォルダ名を名前順に返す"""
+    folder_names = []
+    for folder_name in sorted(os.listdir('../data')):
+        # .DS_Storeを除外
+        if folder_name == '.DS_Store' or folder_name == "output":
+            continue
+        folder_names.append(folder_name)
+    return folder_names
+
+
+def get_make_graph(folder_name: str, profile: bool = False, compact: bool = False) -> MakeGraph:
+    """
+    セッションのMakeGraphを返す（続けて同じセッションを描く間は作り直さない）
+    別のセッションに移ったら前のMakeGraphを捨てるので、プロセスのメモリはセッション1つ分で済む
+    図はプロセスの図（_init_workerで作ったもの）の中身を消して新しいMakeGraphに渡すので、セッションごとに作り直さない
+    """
+    if folder_name not in make_graphs:
+        make_graphs.clear()
+        make_graph = MakeGraph(folder_name, profile=profile, compact=compact)
+        figure = _worker_figure.get('figure')
+        if figure is not None:
+            figure.clf()
+            make_graph.export_figure = figure
+        make_graphs[folder_name] = make_graph
+    return make_graphs[folder_name]
+
+
+def export_figure(folder_name: str, figure: str, save_path: str, filter_num: int = 50, gap: float = None) -> bool:
+    """
+    1つのセッションの図を1つファイルに保存する
+    @param folder_name フォルダ名
+    @param figure 図の種類（FIGURESのどれか）
+    @param save_path 保存先のファイル
+    @param filter_num グラフのタイトルに付けるフィルタ数
+    @param gap この時間[ms]より長く記録が途切れたところで線を切る（Noneなら切らない）
+    @return 保存したかどうか（センサーのデータが無い場合は保存しない）
+    """
+    make_graph = get_make_graph(folder_name)
+
+    match figure:
+        case 'acc' | 'angular':
+            df = make_graph.acc_df if figure == 'acc' else make_graph.angular_df
+            if len(df) == 0:
+                return False
+            make_graph.plot(plt_lists=[df, make_graph.norm(df)], option=[GraphViewOptions.none],
+                            axis=GraphAxis.acc, filter_num=filter_num, save_path=save_path, gap=gap)
+        case 'heart_rate':
+            if len(make_graph.heart_rate_df) == 0:
+                return False
+            make_graph.plot(plt_lists=[make_graph.heart_rate_df], option=[GraphViewOptions.none],
+                            axis=GraphAxis.bpm, filter_num=filter_num, save_path=save_path, gap=gap)
+        case 'ble':
+            # 100以上の値を除去
+            ble_lists = []
+            label_names = []
+            for df, label_name in [(make_graph.ble_char_df, 'char'), (make_graph.ble_tent_df, 'tent')]:
+                if len(df) == 0:
+                    continue
+                ble_lists.append(df[df["rssi"] < 100])
+                label_names.append(label_name)
+            if not ble_lists:
+                return False
+            make_graph.ble_plot(plt_lists=ble_lists, axis=GraphAxis.rssi, filter_num=filter_num,
+                                label_name=label_names, save_path=save_path, gap=gap)
+        case _:
+            raise ValueError('図の種類は ' + ', '.join(FIGURES) + ' のどれかを指定してください: ' + str(figure))
+    return True
+
+
+def try_export_figure(task: tuple) -> tuple:
+    """
+    export_figureを実行し、失敗した場合は例外を止めずにエラー内容を返す
+    profile_dirが指定された場合は、セッションの段階ごとの計測結果を profile_dir/フォルダ名.json に保存する
+    """
+    folder_name, figure, save_path, profile_dir, gap, compact = task
+    try:
+        get_make_graph(folder_name, profile=profile_dir is not None, compact=compact)
+        return save_path, export_figure(folder_name, figure, save_path, gap=gap), None
+    except Exception:
+        return save_path, False, traceback.format_exc()
+    finally:
+        if profile_dir is not None and folder_name in make_graphs:
+            os.makedirs(profile_dir, exist_ok=True)
+            make_graphs[folder_name].profile_report(os.path.join(profile_dir, folder_name + '.json'))
+
+
+def export_all(folder_names: list, output_dir: str, figures: list = FIGURES, file_format: str = 'png',
+               workers: int = 1, profile_dir: str = None, gap: float = None, compact: bool = False) -> dict:
+    """
+    複数のセッションの図をまとめてファイルに保存する
+    同じセッションの図は同じプロセスで続けて描くように並べる
+    @param folder_names フォルダ名の一覧
+    @param output_dir 保存先のフォルダ（output_dir/フォルダ名/図の種類.png に保存する）
+    @param figures 図の種類の一覧
+    @param file_format png, svg など
+    @param workers 並列に処理するプロセス数
+    @param profile_dir セッションごとの段階の計測結果を保存するフォルダ（Noneなら計測しない）
+    @param gap この時間[ms]より長く記録が途切れたところで線を切る（Noneなら切らない）
+    @param compact 読み込んだ列を小さい型にするかどうか（同時に開くセッションのメモリを減らす）
+    @return 保存先のファイル -> エラー内容（失敗したもののみ）
+    """
+    tasks = [(folder_name, figure, os.path.join(output_dir, folder_name, figure + '.' + file_format), profile_dir, gap,
+              compact)
+             for folder_name in folder_names for figure in figures]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            results = list(executor.map(try_export_figure, tasks, chunksize=len(figures)))
+    else:
+        _init_worker()
+        results = [try_export_figure(task) for task in tasks]
+
+    errors = {}
+    for save_path, saved, error in results:
+        if error is not None:
+            logger.error('%s\n%s', save_path, error)
+            errors[save_path] = error
+        elif saved:
+            logger.info('%s', save_path)
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='セッションのグラフをまとめてファイルに保存する')
+    parser.add_argument('folders', nargs='*', help='フォルダ名（省略すると../data/以下の全て）')
+    parser.add_argument('--output', default='../image', help='保存先のフォルダ')
+    parser.add_argument('--figures', nargs='*', default=FIGURES, help='図の種類（' + ', '.join(FIGURES) + '）')
+    parser.add_argument('--format', default='png', help='png, svg など')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列に処理するプロセス数')
+    parser.add_argument('--profile', default=None, help='セッションごとの段階の計測結果（json）を保存するフォルダ')
+    parser.add_argument('--gap', type=float, default=None, help='この時間[ms]より長く記録が途切れたところで線を切る')
+    parser.add_argument('--compact', action='store_true', help='読み込んだ列を小さい型にしてメモリを減らす')
+    parser.add_argument('--log-level', default='WARNING', help='ログの出力レベル（DEBUG, INFO, WARNINGなど）')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+
+    errors = export_all(args.folders or session_folder_names(), args.output, figures=args.figures,
+                        file_format=args.format, workers=args.workers, profile_dir=args.profile, gap=args.gap,
+                        compact=args.compact)
+    if errors:
+        logger.error('失敗した図: %s', ', '.join(errors))
@@ -0,0 +1,151 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact import compact_frame
+from profiling import PipelineProfiler, stage
+
+# キャッシュの形式を変えたときは上げる（古いキャッシュは読み込まずに作り直す）
+CACHE_VERSION = 2
+META_FILE = 'meta.json'
+
+
+def cache_path(file_path: str, cache_dir: str) -> str:
+    """
+    CSVファイルに対応するキャッシュのフォルダを返す
+    @param file_path CSVファイルのパス
+    @param cache_dir キャッシュを置くフォルダ
+    @return キャッシュのフォルダのパス
+    """
+    return os.path.join(cache_dir, os.path.basename(file_path).replace('.csv', ''))
+
+
+def _source_key(file_path: str) -> dict:
+    """キャッシュが有効かどうかを判定するための元ファイルの情報"""
+    stat = os.stat(file_path)
+    return {'version': CACHE_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_cache(file_path: str, cache_dir: str) -> pd.DataFrame | None:
+    """
+    キャッシュが有効ならメモリマップで読み込む
+    @param file_path CSVファイルのパス
+    @param cache_dir キャッシュを置くフォルダ
+    @return データフレーム（キャッシュが無い・古い場合はNone）
+    """
+    folder = cache_path(file_path, cache_dir)
+    try:
+        with open(os.path.join(folder, META_FILE), encoding='utf-8') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('source') != _source_key(file_path):
+        return None
+
+    columns = {}
+    for index, column in enumerate(meta['columns']):
+        # 'c'はコピーオンライトなので、書き換えてもキャッシュのファイルは変わらない
+        values = np.asarray(np.load(os.path.join(folder, str(index) + '.npy'), mmap_mode='c'))
+        if meta['strings'][index]:
+            values = pd.Series(values.astype(object)).astype(meta['dtypes'][index]).to_numpy()
+        columns[column] = values
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['time_origin'] = meta['time_origin']
+    return df
+
+
+def save_cache(file_path: str, cache_dir: str, df: pd.DataFrame) -> None:
+    """
+    データフレームを列ごとの.npyファイルとして保存する
+    メタデータは最後に書き込むので、途中で止まっても壊れたキャッシュは読まれない
+    @param file_path CSVファイルのパス
+    @param cache_dir キャッシュを置くフォルダ
+    @param df 保存するデータフレーム
+    """
+    folder = cache_path(file_path, cache_dir)
+    os.makedirs(folder, exist_ok=True)
+
+    # 古いメタデータを先に消して、書き込み中のキャッシュを読ませない
+    meta_file = os.path.join(folder, META_FILE)
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+
+    strings = []
+    for index, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        strings.append(values.dtype == object)
+        if values.dtype == object:
+            # 文字列はメモリマップできる固定長の文字列にする
+            values = values.astype(str)
+        np.save(os.path.join(folder, str(index) + '.npy'), values)
+
+    meta = {
+        'source': _source_key(file_path),
+        'columns': [str(column) for column in df.columns],
+        'dtypes': [str(dtype) for dtype in df.dtypes],
+        'strings': strings,
+        'time_origin': df.attrs.get('time_origin', 0),
+    }
+    tmp_file = meta_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+    os.replace(tmp_file, meta_file)
+
+
+def read_sensor_csv(file_path: str, cache_dir: str | None = None,
+                    profiler: PipelineProfiler | None = None, compact: bool = False) -> pd.DataFrame:
+    """
+    センサーのCSVを読み込み、時間を0から始める
+    元の先頭の時刻はdf.attrs['time_origin']に残す
+    cache_dirを指定すると、解析済みのデータフレームをキャッシュして次回からはそれを読み込む
+    キャッシュは元ファイルのサイズと更新時刻が変わると作り直す
+    @param file_path CSVファイルのパス
+    @param cache_dir キャッシュを置くフォルダ（Noneならキャッシュしない）
+    @param profiler 段階ごとの時間を記録するPipelineProfiler（Noneなら記録しない）
+    @param compact 列を小さい型に変換するかどうか（compact_frameを参照、キャッシュは元の型のまま保存する）
+    @return データフレーム
+    """
+    if cache_dir is not None:
+        with stage(profiler, 'load_cache') as record:
+            df = load_cache(file_path, cache_dir)
+            record['rows'] = None if df is None else len(df)
+        if df is not None:
+            return _compact(df, profiler) if compact else df
+
+    with stage(profiler, 'read_csv') as record:
+        df = pd.read_csv(file_path)
+        record['rows'] = len(df)
+
+    # 時間を0から始める
+    with stage(profiler, 'time_shift', rows=len(df)):
+        time_origin = df['time'][0]
+        df['time'] = (df['time'] - time_origin)
+        df.attrs['time_origin'] = time_origin.item() if hasattr(time_origin, 'item') else time_origin
+
+    if cache_dir is not None:
+        with stage(profiler, 'save_cache', rows=len(df)):
+            save_cache(file_path, cache_dir, df)
+    return _compact(df, profiler) if compact else df
+
+
+def _compact(df: pd.DataFrame, profiler: PipelineProfiler | None) -> pd.DataFrame:
+    """compact_frameを段階として記録しながら実行する"""
+    with stage(profiler, 'compact', rows=len(df)):
+        return compact_frame(df)
+
+
+def read_answer_csv(file_path: str, compact: bool = False) -> pd.DataFrame:
+    """
+    ans.csv（time: UNIX時間 ms, content: ラベル）を読み込む
+    時間は0から始めない（ラベルの時刻はセンサーの時刻とそのまま比べる）
+    @param file_path ans.csvのパス
+    @param compact contentをcategoryにするかどうか
+    @return データフレーム
+    """
+    df = pd.read_csv(file_path)
+    if compact and 'content' in df:
+        df['content'] = df['content'].astype('category')
+    return df
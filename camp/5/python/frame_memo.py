@@ -0,0 +1,51 @@
+import weakref
+
+import numpy as np
+
+
+class FrameMemo:
+    """
+    データフレーム・Seriesごとに計算結果を覚えておく
+    キーはオブジェクトのidと計算のパラメーターで、オブジェクトが無くなったら結果も消す（idが使い回されても古い結果を返さない）
+    同じオブジェクトでも、行数か最初・最後の時刻が変わっていれば計算し直す
+    注意: 判定に使うのは行数と最初・最後の時刻だけなので、途中の行のtimeをその場で書き換えても検出できず、
+    古い結果を返す（timeを書き換えたらinvalidateを呼ぶか、新しいデータフレームを作る）
+    """
+
+    def __init__(self):
+        # (id, パラメーター) -> (参照, 行数と最初・最後の時刻, 結果)
+        self.entries = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def check(time: np.ndarray) -> tuple:
+        """計算し直すかどうかの判定に使う値（行数と最初・最後の時刻）"""
+        return len(time), time[0] if len(time) else None, time[-1] if len(time) else None
+
+    def get(self, obj, time: np.ndarray, compute, *params):
+        """
+        覚えている結果を返す（無いか、timeが変わっていればcomputeで計算して覚える）
+        @param obj データフレームまたはSeries
+        @param time objの時刻の配列
+        @param compute 結果を計算する関数（引数なし）
+        @param params 計算のパラメーター（キーに含める）
+        @return 結果
+        """
+        key = (id(obj),) + params
+        check = self.check(time)
+        cached = self.entries.get(key)
+        if cached is not None and cached[0]() is obj and cached[1] == check:
+            return cached[2]
+
+        value = compute()
+        if cached is None:
+            weakref.finalize(obj, self.entries.pop, key, None)
+        self.entries[key] = (weakref.ref(obj), check, value)
+        return value
+
+    def invalidate(self, obj) -> None:
+        """オブジェクトの結果を全て捨てる（timeをその場で書き換えたときに使う）"""
+        for key in [key for key in self.entries if key[0] == id(obj)]:
+            del self.entries[key]
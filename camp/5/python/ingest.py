@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from window_stream import WindowStatsStream
+
+logger = logging.getLogger(__name__)
+
+# センサーの名前（csvのファイル名と同じ）-> time以外の列
+SENSOR_COLUMNS = {
+    'acc': ['x', 'y', 'z'],
+    'Angular': ['x', 'y', 'z'],
+    'HartRate': ['bpm'],
+    'BLE_isu': ['rssi'],
+    'BLE_tent': ['rssi'],
+}
+
+
+class RingBuffer:
+    """
+    届いたサンプルを固定の大きさの配列にためておく
+    いっぱいになったら呼び出し側で取り出す（取り出すまで新しいサンプルは入らない）
+    @param capacity ためておけるサンプルの数
+    @param width 1サンプルの値の数（timeを含む）
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.values = np.empty((capacity, width), dtype=np.float64)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def full(self) -> bool:
+        return self.count == len(self.values)
+
+    def push(self, row) -> None:
+        """サンプルを1つ追加する（いっぱいの場合はValueError）"""
+        if self.full():
+            raise ValueError('バッファがいっぱいです')
+        self.values[(self.start + self.count) % len(self.values)] = row
+        self.count += 1
+
+    def drain(self) -> np.ndarray:
+        """ためているサンプルを古い順に全て取り出す"""
+        end = self.start + self.count
+        if end <= len(self.values):
+            out = self.values[self.start:end].copy()
+        else:
+            out = np.concatenate([self.values[self.start:], self.values[:end - len(self.values)]])
+        self.start = end % len(self.values)
+        self.count = 0
+        return out
+
+
+class IngestService:
+    """
+    センサーのサンプルを受け取り、センサーごとにMakeGraph.calcと同じウィンドウの統計量を順に出力する
+    サンプルは1行ずつの「センサー名,time,値,...」（例: acc,1688978795000,0.1,0.2,9.8）で受け取る
+    サンプルはセンサーごとのリングバッファにためて、flush_intervalごと（またはいっぱいになったとき）に
+    WindowStatsStreamに渡すので、ウィンドウが閉じてから出力されるまでの遅れはおよそflush_interval以内になる
+    @param filter_num ウィンドウの長さ ms
+    @param on_stats 統計量を受け取る関数（センサー名, データフレーム）
+    @param capacity センサーごとのリングバッファの大きさ
+    @param flush_interval リングバッファを処理する間隔 秒
+    """
+
+    def __init__(self, filter_num: float, on_stats, capacity: int = 4096, flush_interval: float = 0.1):
+        self.filter_num = filter_num
+        self.on_stats = on_stats
+        self.flush_interval = flush_interval
+        self.buffers = {sensor: RingBuffer(capacity, len(columns) + 1) for sensor, columns in SENSOR_COLUMNS.items()}
+        self.streams = {sensor: WindowStatsStream(filter_num) for sensor in SENSOR_COLUMNS}
+        self.last_time = {}
+        # 読めなかった行・時間が戻った行の数
+        self.rejected = 0
+        # 開いているTCPの接続を処理しているタスク
+        self.connections = set()
+
+    def handle_line(self, line: str) -> None:
+        """
+        1行のサンプルを受け取る
+        形式が違う行、前のサンプルより時間が戻った行は数えて捨てる（UDPでは順番が入れ替わることがある）
+        @param line 「センサー名,time,値,...」
+        """
+        fields = line.strip().split(',')
+        buffer = self.buffers.get(fields[0])
+        if buffer is None or len(fields) != buffer.values.shape[1] + 1:
+            self.rejected += 1
+            return
+        try:
+            row = [float(field) for field in fields[1:]]
+        except ValueError:
+            self.rejected += 1
+            return
+
+        sensor = fields[0]
+        if row[0] < self.last_time.get(sensor, -np.inf):
+            self.rejected += 1
+            return
+        self.last_time[sensor] = row[0]
+
+        buffer.push(row)
+        if buffer.full():
+            self.flush(sensor)
+
+    def flush(self, sensor: str, final: bool = False) -> None:
+        """
+        リングバッファのサンプルをWindowStatsStreamに渡し、閉じたウィンドウの統計量を出力する
+        @param sensor センサー名
+        @param final データの終わりとして残りのウィンドウも閉じるかどうか
+        """
+        rows = self.buffers[sensor].drain()
+        stream = self.streams[sensor]
+        if len(rows) > 0:
+            chunk = pd.DataFrame(rows, columns=['time'] + SENSOR_COLUMNS[sensor])
+            self.__emit(sensor, stream.push(chunk))
+        if final and stream.columns is not None:
+            self.__emit(sensor, stream.close())
+
+    def flush_all(self, final: bool = False) -> None:
+        """全てのセンサーのリングバッファを処理する"""
+        for sensor in self.buffers:
+            self.flush(sensor, final=final)
+
+    def __emit(self, sensor: str, info_df: pd.DataFrame) -> None:
+        if len(info_df) > 0:
+            self.on_stats(sensor, info_df)
+
+    async def flush_loop(self) -> None:
+        """flush_intervalごとにリングバッファを処理し続ける"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush_all()
+
+    async def handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """TCPの接続から1行ずつサンプルを読み込む"""
+        peer = writer.get_extra_info('peername')
+        logger.info('接続: %s', peer)
+        task = asyncio.current_task()
+        self.connections.add(task)
+        rest = b''
+        try:
+            while True:
+                # まとめて読み込み、最後の改行より後は次に読み込んだものとつなげる
+                data = await reader.read(65536)
+                if not data:
+                    break
+                lines = (rest + data).split(b'\n')
+                rest = lines.pop()
+                for line in lines:
+                    if line:
+                        self.handle_line(line.decode('utf-8', errors='replace'))
+            if rest:
+                self.handle_line(rest.decode('utf-8', errors='replace'))
+        except asyncio.CancelledError:
+            # close_connectionsで切断した（キャンセルのまま終えるとstart_serverがトレースバックを出すので、普通に終える）
+            logger.info('送り終わる前に切断: %s', peer)
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            logger.info('切断: %s', peer)
+
+    async def close_connections(self, timeout: float = None) -> None:
+        """
+        開いているTCPの接続が送り終わって閉じるまで待つ
+        timeout秒たっても閉じない接続は切断する（その接続のまだ読み込んでいないデータは捨てる）
+        @param timeout 待つ時間 秒（Noneなら全て閉じるまで待つ）
+        """
+        tasks = list(self.connections)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning('閉じなかった接続を切断します: %d', len(pending))
+            for task in pending:
+                task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error('接続の処理に失敗しました: %r', result)
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    """1つのデータグラムに1行以上のサンプルを入れて受け取る"""
+
+    def __init__(self, service: IngestService):
+        self.service = service
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            if line:
+                self.service.handle_line(line)
+
+
+async def serve(service: IngestService, host: str = '127.0.0.1', port: int = 9999, udp: bool = False,
+                duration: float = None, drain_timeout: float = 10.0) -> None:
+    """
+    サンプルを受け取るサーバーを起動する
+    止めるときは新しい接続を受け付けるのをやめ、開いているTCPの接続が送り終わるのをdrain_timeout秒まで待ってから、
+    残りのウィンドウを閉じて出力する（drain_timeoutを過ぎても開いている接続のまだ読み込んでいないデータは捨てる）
+    UDPは止めた時点で受け取るのをやめる
+    @param service IngestService
+    @param host 待ち受けるアドレス
+    @param port 待ち受けるポート
+    @param udp TrueならUDP、FalseならTCP
+    @param duration 起動している時間 秒（Noneなら止めるまで）
+    @param drain_timeout 止めるときに開いている接続を待つ時間 秒（Noneなら全て閉じるまで待つ）
+    """
+    loop = asyncio.get_running_loop()
+    flusher = asyncio.create_task(service.flush_loop())
+    if udp:
+        transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(service), local_addr=(host, port))
+        server = None
+    else:
+        server = await asyncio.start_server(service.handle_tcp, host, port)
+        transport = None
+    logger.info('待ち受け: %s:%d (%s)', host, port, 'udp' if udp else 'tcp')
+
+    try:
+        if duration is None:
+            await asyncio.Event().wait()
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        if server is not None:
+            server.close()
+            await service.close_connections(drain_timeout)
+            await server.wait_closed()
+        if transport is not None:
+            transport.close()
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        service.flush_all(final=True)
+        if service.rejected:
+            logger.warning('捨てた行: %d', service.rejected)
+
+
+def csv_writer(output_dir: str):
+    """
+    統計量をセンサーごとのcsv（output_dir/センサー名_info.csv）に追記する関数を返す
+    @param output_dir 保存先のフォルダ
+    @return on_statsに渡す関数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = set()
+
+    def write(sensor: str, info_df: pd.DataFrame) -> None:
+        file_path = os.path.join(output_dir, sensor + '_info.csv')
+        info_df.to_csv(file_path, mode='a' if sensor in started else 'w', header=sensor not in started, index=True)
+        started.add(sensor)
+
+    return write
+
+
+def json_writer(sensor: str, info_df: pd.DataFrame) -> None:
+    """統計量を1ウィンドウ1行のjsonで標準出力に出す"""
+    for label, row in info_df.iterrows():
+        print(json.dumps({'sensor': sensor, 'window': int(label), **row.to_dict()}, ensure_ascii=False), flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='センサーのサンプルを受け取り、ウィンドウの統計量を出力する')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス')
+    parser.add_argument('--port', type=int, default=9999, help='待ち受けるポート')
+    parser.add_argument('--udp', action='store_true', help='TCPの代わりにUDPで受け取る')
+    parser.add_argument('--window', type=float, default=1000, help='ウィンドウの長さ ms')
+    parser.add_argument('--flush-interval', type=float, default=0.1, help='リングバッファを処理する間隔 秒')
+    parser.add_argument('--capacity', type=int, default=4096, help='センサーごとのリングバッファの大きさ')
+    parser.add_argument('--output', default=None, help='統計量のcsvを保存するフォルダ（省略すると標準出力にjsonで出す）')
+    parser.add_argument('--duration', type=float, default=None, help='起動している時間 秒')
+    parser.add_argument('--drain-timeout', type=float, default=10.0,
+                        help='止めるときに開いている接続が送り終わるのを待つ時間 秒（過ぎたら切断して残りは捨てる）')
+    parser.add_argument('--log-level', default='INFO', help='ログの出力レベル')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+
+    service = IngestService(args.window, csv_writer(args.output) if args.output else json_writer,
+                            capacity=args.capacity, flush_interval=args.flush_interval)
+    try:
+        asyncio.run(serve(service, args.host, args.port, udp=args.udp, duration=args.duration,
+                          drain_timeout=args.drain_timeout))
+    except KeyboardInterrupt:
+        pass
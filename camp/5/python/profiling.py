@@ -0,0 +1,123 @@
+import contextlib
+import json
+import time
+import tracemalloc
+
+
+class PipelineProfiler:
+    """
+    処理の段階（csvの読み込み、時間の変換、calc、fft、グラフの描画など）ごとに時間・行数・メモリを記録する
+    段階は入れ子にでき、flame()で入れ子のまま集計できる
+    @param session セッション名（フォルダ名）
+    @param memory メモリも計測するかどうか（tracemallocを使うので処理が遅くなる）
+    """
+
+    def __init__(self, session: str, memory: bool = False):
+        self.session = session
+        self.memory = memory
+        self.records = []
+        self.stack = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows: int = None):
+        """
+        段階を計測する
+        withの中で record['rows'] に行数を入れると、処理の後にわかる行数も記録できる
+        @param name 段階の名前
+        @param rows 行数
+        @return 記録（dict）
+        """
+        record = {'stage': name, 'path': ';'.join([entry['record']['stage'] for entry in self.stack] + [name]),
+                  'rows': rows, 'seconds': None, 'peak_mb': None}
+        entry = {'record': record, 'child_peak': 0}
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                entry['started_tracing'] = True
+            self.__close_peak()
+            entry['memory_start'] = tracemalloc.get_traced_memory()[0]
+
+        self.stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.stack.pop()
+
+            if self.memory:
+                # 子の段階のピークと、子の後のピークの大きい方がこの段階のピーク
+                peak = max(tracemalloc.get_traced_memory()[1], entry['child_peak'])
+                record['peak_mb'] = max(peak - entry['memory_start'], 0) / 1024 / 1024
+                if self.stack:
+                    self.stack[-1]['child_peak'] = max(self.stack[-1]['child_peak'], peak)
+                tracemalloc.reset_peak()
+                if entry.get('started_tracing'):
+                    tracemalloc.stop()
+
+            self.records.append(record)
+
+    def __close_peak(self) -> None:
+        """親の段階のここまでのピークを記録してから、ピークをリセットする"""
+        if self.stack:
+            self.stack[-1]['child_peak'] = max(self.stack[-1]['child_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    def report(self) -> dict:
+        """
+        記録をまとめる
+        @return セッション名、全ての記録、段階ごとの合計（回数・秒・行数・最大のピーク）
+        """
+        summary = {}
+        for record in self.records:
+            total = summary.setdefault(record['path'], {'count': 0, 'seconds': 0.0, 'rows': 0, 'peak_mb': None})
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            total['rows'] += record['rows'] or 0
+            if record['peak_mb'] is not None:
+                total['peak_mb'] = max(total['peak_mb'] or 0, record['peak_mb'])
+
+        top_level = [record for record in self.records if ';' not in record['path']]
+        return {
+            'session': self.session,
+            'total_seconds': sum(record['seconds'] for record in top_level),
+            'stages': self.records,
+            'summary': summary,
+        }
+
+    def to_json(self, file_path: str) -> None:
+        """記録をjsonファイルに保存する"""
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
+
+    def flame(self) -> str:
+        """
+        flamegraph.plなどで読める形式（「セッション;段階;子の段階 マイクロ秒」の行）で返す
+        値は子の段階を除いたその段階だけの時間
+        """
+        summary = self.report()['summary']
+        self_time = {path: total['seconds'] for path, total in summary.items()}
+        for path, total in summary.items():
+            if ';' in path:
+                parent = path.rsplit(';', 1)[0]
+                if parent in self_time:
+                    self_time[parent] -= total['seconds']
+
+        lines = []
+        for path, seconds in self_time.items():
+            lines.append(self.session + ';' + path + ' ' + str(max(int(seconds * 1e6), 0)))
+        return '\n'.join(lines)
+
+
+def stage(profiler: PipelineProfiler | None, name: str, rows: int = None):
+    """
+    profilerがNoneなら何も計測しない（計測しないときの処理の時間は変わらない）
+    @param profiler PipelineProfiler、またはNone
+    @param name 段階の名前
+    @param rows 行数
+    @return withで使うコンテキストマネージャ（記録のdictを返す）
+    """
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name, rows=rows)
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import time
+
+import pandas as pd
+
+from ingest import SENSOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def session_lines(folder: str, sensors: list = None):
+    """
+    セッションのcsvを、記録開始からの経過時間の順に「センサー名,time,値,...」の行にして返す
+    センサーごとに時計が違う（BLEは端末の起動からの時間）ので、並べる順番はセンサーごとに0から始めた時間で決める
+    送る行のtimeは元の値のまま
+    @param folder セッションのフォルダ
+    @param sensors 送るセンサー名の一覧（Noneなら全て）
+    @return (経過時間 ms, 行) を返すジェネレータ
+    """
+    iterators = []
+    for sensor, columns in SENSOR_COLUMNS.items():
+        file_path = os.path.join(folder, sensor + '.csv')
+        if (sensors is not None and sensor not in sensors) or not os.path.exists(file_path):
+            continue
+        df = pd.read_csv(file_path)
+        if len(df) == 0:
+            continue
+        elapsed = (df['time'] - df['time'].iloc[0]).tolist()
+        text = df[['time'] + columns].astype(str).agg(','.join, axis=1)
+        lines = (sensor + ',' + text).tolist()
+        iterators.append(zip(elapsed, lines))
+    return heapq.merge(*iterators, key=lambda item: item[0])
+
+
+async def replay(folder: str, host: str = '127.0.0.1', port: int = 9999, udp: bool = False, speed: float = 1.0,
+                 sensors: list = None, batch: int = 64) -> int:
+    """
+    セッションのcsvを記録と同じ間隔（speed倍速）でIngestServiceに送る
+    @param folder セッションのフォルダ
+    @param host 送り先のアドレス
+    @param port 送り先のポート
+    @param udp TrueならUDP、FalseならTCP
+    @param speed 再生の速さ（2なら2倍速、0なら待たずに全て送る）
+    @param sensors 送るセンサー名の一覧（Noneなら全て）
+    @param batch 一度に送る行の数の上限（UDPでは1つのデータグラムにまとめる）
+    @return 送った行の数
+    """
+    if udp:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        writer = None
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+        sock = None
+
+    def send(lines: list) -> None:
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        if sock is not None:
+            sock.sendto(data, (host, port))
+        else:
+            writer.write(data)
+
+    start = None
+    sent = 0
+    pending = []
+    try:
+        for elapsed, line in session_lines(folder, sensors):
+            # csvを読み終えて最初の行ができたときから時間を計る
+            if start is None:
+                start = time.perf_counter()
+            if speed > 0:
+                wait = elapsed / 1000 / speed - (time.perf_counter() - start)
+                if wait > 0:
+                    # 待つ前にたまっている行を送る
+                    if pending:
+                        send(pending)
+                        pending = []
+                    if writer is not None:
+                        await writer.drain()
+                    await asyncio.sleep(wait)
+            pending.append(line)
+            sent += 1
+            if len(pending) >= batch:
+                send(pending)
+                pending = []
+                if writer is not None:
+                    await writer.drain()
+                else:
+                    # 遅れていて待たない場合でも、同じループのサーバーなどに処理を回す
+                    await asyncio.sleep(0)
+        if pending:
+            send(pending)
+    finally:
+        if writer is not None:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        if sock is not None:
+            sock.close()
+    logger.info('送った行: %d (%.1f 秒)', sent, 0.0 if start is None else time.perf_counter() - start)
+    return sent
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='セッションのcsvをingest.pyのサーバーに再生して送る')
+    parser.add_argument('folder', help='フォルダ名（../data/以下）')
+    parser.add_argument('--host', default='127.0.0.1', help='送り先のアドレス')
+    parser.add_argument('--port', type=int, default=9999, help='送り先のポート')
+    parser.add_argument('--udp', action='store_true', help='TCPの代わりにUDPで送る')
+    parser.add_argument('--speed', type=float, default=1.0, help='再生の速さ（0なら待たずに全て送る）')
+    parser.add_argument('--sensors', nargs='*', default=None, help='送るセンサー名（' + ', '.join(SENSOR_COLUMNS) + '）')
+    parser.add_argument('--log-level', default='INFO', help='ログの出力レベル')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+
+    asyncio.run(replay(os.path.join('../data', args.folder), args.host, args.port, udp=args.udp, speed=args.speed,
+                       sensors=args.sensors))
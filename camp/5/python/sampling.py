@@ -0,0 +1,113 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from frame_memo import FrameMemo
+
+# 間隔の中央値の何倍を超えたら記録の途切れ（ギャップ）とみなすか
+GAP_FACTOR = 3.0
+
+
+class SamplingInfo(NamedTuple):
+    """
+    サンプリングの情報
+    frequency: サンプリング周波数[Hz]（間隔の中央値から求める）
+    median_dt: 間隔の中央値（timeの単位）
+    jitter: ギャップを除いた間隔の標準偏差（timeの単位）
+    gaps: ギャップの直前の行の位置（0から数えた位置で、indexのラベルではない）
+    rows: 行数
+    """
+    frequency: float
+    median_dt: float
+    jitter: float
+    gaps: np.ndarray
+    rows: int
+
+
+# データフレーム・Seriesごとの計算結果（途中の行のtimeをその場で書き換えた場合はFrameMemoの注意を参照）
+_frame_cache = FrameMemo()
+# ファイルごとの計算結果（(パス, サイズ, 更新時刻) -> 結果）
+_file_cache = {}
+
+
+def sampling_info_from_time(time: np.ndarray, time_scale: float = 1000, gap_factor: float = GAP_FACTOR) -> SamplingInfo:
+    """
+    時刻の配列からサンプリングの情報を計算する
+    平均ではなく中央値を使うので、記録の途切れや間引きがあっても周波数はずれない
+    @param time 時刻の配列（昇順）
+    @param time_scale timeの1秒あたりの値（msなら1000、秒なら1）
+    @param gap_factor 間隔の中央値の何倍を超えたらギャップとみなすか
+    @return SamplingInfo（2行未満の場合は周波数がNaN）
+    """
+    time = np.asarray(time, dtype=np.float64)
+    dt = np.diff(time)
+    valid = np.isfinite(dt) & (dt > 0)
+    if not valid.any():
+        return SamplingInfo(np.nan, np.nan, np.nan, np.empty(0, dtype=np.int64), len(time))
+
+    median_dt = float(np.median(dt[valid]))
+    gap = valid & (dt > median_dt * gap_factor)
+    regular = valid & ~gap
+    jitter = float(np.std(dt[regular])) if regular.any() else 0.0
+    return SamplingInfo(time_scale / median_dt, median_dt, jitter, np.flatnonzero(gap), len(time))
+
+
+def _time_values(data: pd.DataFrame | pd.Series, column: str) -> np.ndarray:
+    """データフレームならtimeの列、Seriesならその値を返す"""
+    if isinstance(data, pd.DataFrame):
+        return data[column].to_numpy()
+    return data.to_numpy()
+
+
+def _cached_frame_info(data: pd.DataFrame | pd.Series, column: str, time_scale: float,
+                       gap_factor: float) -> SamplingInfo:
+    """
+    データフレーム・Seriesごとに計算結果を覚えておく
+    同じオブジェクトでも行数や最初・最後の時刻が変わっていれば計算し直す
+    """
+    time = _time_values(data, column)
+    return _frame_cache.get(data, time,
+                            lambda: sampling_info_from_time(time, time_scale=time_scale, gap_factor=gap_factor),
+                            column, time_scale, gap_factor)
+
+
+def _cached_file_info(file_path: str, column: str, time_scale: float, gap_factor: float) -> SamplingInfo:
+    """csvファイルのtimeの列だけを読み込んで計算する（ファイルが変わっていなければ前回の結果を返す）"""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, column, time_scale, gap_factor)
+    if key not in _file_cache:
+        time = pd.read_csv(file_path, usecols=[column])[column].to_numpy()
+        _file_cache[key] = sampling_info_from_time(time, time_scale=time_scale, gap_factor=gap_factor)
+    return _file_cache[key]
+
+
+def sampling_info(data, column: str = 'time', time_scale: float = 1000, gap_factor: float = GAP_FACTOR) -> SamplingInfo:
+    """
+    サンプリング周波数・間隔の中央値・ジッター・ギャップを求める
+    位置で計算するので、フィルタしてindexが0から始まらないデータフレームでも正しく求まる
+    @param data データフレーム、時刻のSeries、またはcsvファイルのパス
+    @param column 時刻の列名
+    @param time_scale timeの1秒あたりの値（msなら1000、秒なら1）
+    @param gap_factor 間隔の中央値の何倍を超えたらギャップとみなすか
+    @return SamplingInfo
+    """
+    if isinstance(data, (str, os.PathLike)):
+        return _cached_file_info(os.fspath(data), column, time_scale, gap_factor)
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return _cached_frame_info(data, column, time_scale, gap_factor)
+    return sampling_info_from_time(data, time_scale=time_scale, gap_factor=gap_factor)
+
+
+def sampling_frequency(data, column: str = 'time', time_scale: float = 1000) -> float:
+    """
+    サンプリング周波数[Hz]を求める
+    camp/4/python, study/mahjanのsampling.pyとstudy/fft/calculate_sampling_frequency.pyは同じ推定を単体で持つ
+    （フォルダごとに単体で動かせるように、他のフォルダを読み込まない）ので、推定の方法を変えるときは一緒に変える
+    @param data データフレーム、時刻のSeries、またはcsvファイルのパス
+    @param column 時刻の列名
+    @param time_scale timeの1秒あたりの値（msなら1000、秒なら1）
+    @return サンプリング周波数[Hz]
+    """
+    return sampling_info(data, column=column, time_scale=time_scale).frequency
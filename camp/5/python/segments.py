@@ -0,0 +1,88 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+class SegmentIndex(NamedTuple):
+    """
+    記録が途切れずに続いている区間（セグメント）の一覧
+    位置は0から数えた行の位置で、indexのラベルではない
+    starts: 区間の開始位置
+    stops: 区間の終了位置（含まない）
+    start_times: 区間の最初の時刻
+    end_times: 区間の最後の時刻
+    gaps: 区間の直前の途切れの長さ（最初の区間は0）
+    threshold: これより長い時間差を途切れとみなした値
+    """
+    starts: np.ndarray
+    stops: np.ndarray
+    start_times: np.ndarray
+    end_times: np.ndarray
+    gaps: np.ndarray
+    threshold: float
+
+    def gap_positions(self) -> np.ndarray:
+        """途切れの直前の行の位置（最後の区間以外の区間の最後の行）"""
+        return self.stops[:-1] - 1
+
+    def lengths(self) -> np.ndarray:
+        """区間ごとの行数"""
+        return self.stops - self.starts
+
+
+def find_segments(time: np.ndarray, threshold: float) -> SegmentIndex:
+    """
+    隣の行との時間差がthresholdより大きいところで区切り、途切れずに続いている区間を求める
+    @param time 時間の配列（昇順）
+    @param threshold 途切れとみなす時間差（timeと同じ単位）
+    @return SegmentIndex
+    """
+    time = np.asarray(time)
+    n = len(time)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return SegmentIndex(empty, empty, time[:0], time[:0], time[:0], threshold)
+
+    dt = np.diff(time)
+    gap = np.flatnonzero(dt > threshold)
+    starts = np.concatenate([[0], gap + 1]).astype(np.int64)
+    stops = np.concatenate([gap + 1, [n]]).astype(np.int64)
+    gaps = np.concatenate([np.zeros(1, dtype=dt.dtype), dt[gap]])
+    return SegmentIndex(starts, stops, time[starts], time[stops - 1], gaps, threshold)
+
+
+def segment_window_starts(segments: SegmentIndex, window: int, hop: int) -> np.ndarray:
+    """
+    区間をまたがないウィンドウの開始位置を返す（区間ごとに先頭からhopずつずらす）
+    @param segments SegmentIndex
+    @param window ウィンドウの行数
+    @param hop ウィンドウをずらす行数
+    @return ウィンドウの開始位置の配列
+    """
+    counts = np.maximum((segments.lengths() - window) // hop + 1, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    step = np.arange(total) - np.repeat(offsets, counts)
+    return np.repeat(segments.starts, counts) + step * hop
+
+
+def break_at_gaps(x: np.ndarray, y: np.ndarray, segments: SegmentIndex) -> tuple:
+    """
+    途切れの位置にNaNの点を入れて、グラフの線が途切れをまたいでつながらないようにする
+    区間の時刻で判定するので、点を減らした後の配列にも使える
+    @param x 時間の配列
+    @param y 値の配列
+    @param segments 元の時間の配列から求めたSegmentIndex
+    @return (NaNを入れた時間の配列, NaNを入れた値の配列)
+    """
+    if len(segments.starts) < 2 or len(x) < 2:
+        return x, y
+    segment = np.searchsorted(segments.start_times, x, side='right')
+    positions = np.flatnonzero(np.diff(segment) != 0) + 1
+    if len(positions) == 0:
+        return x, y
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return np.insert(x, positions, x[positions - 1]), np.insert(y, positions, np.nan)
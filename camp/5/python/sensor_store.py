@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+# ファイルの先頭の識別子と形式のバージョン
+MAGIC = b'SNSRSTOR'
+STORE_VERSION = 1
+# ヘッダーの大きさ（固定なので、追記してもレコードの位置は変わらない）
+HEADER_SIZE = 4096
+# 時間のインデックスに記録するレコードの間隔
+INDEX_STEP = 4096
+# 保存するファイルの拡張子
+STORE_SUFFIX = '.bin'
+INDEX_SUFFIX = '.idx'
+
+
+class SensorStore:
+    """
+    センサーの記録を固定長のレコードとして追記していくファイル
+    ファイルは「ヘッダー（HEADER_SIZEバイト）+ レコードの並び」で、レコードは追記するだけで書き換えない
+    timeは最初のレコードの時刻（time_origin）からの経過時間 msで保存するので、読み込んだ列をそのままMakeGraphで使える
+    INDEX_STEP件ごとのtimeを別のファイル（.idx）に保存し、時間の範囲の読み込みはそれを使って位置を求める
+    読み込みはメモリマップで行い、ファイル全体を読み込まない
+    @param path ファイルのパス
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            header = file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError('センサーのストアのファイルではありません: ' + path)
+        version, length = struct.unpack('<II', header[len(MAGIC):len(MAGIC) + 8])
+        if version != STORE_VERSION:
+            raise ValueError('対応していない形式のバージョンです: ' + str(version))
+        meta = json.loads(header[len(MAGIC) + 8:len(MAGIC) + 8 + length].decode('utf-8'))
+        self.dtype = np.dtype([(name, dtype) for name, dtype in meta['dtype']])
+        self.time_origin = meta['time_origin']
+
+    @classmethod
+    def create(cls, path: str, dtype: np.dtype, time_origin: int) -> 'SensorStore':
+        """
+        空のストアを作成する
+        @param path ファイルのパス
+        @param dtype レコードの型（最初の列はtime）
+        @param time_origin timeの基準の時刻
+        @return SensorStore
+        """
+        dtype = np.dtype(dtype)
+        if dtype.names[0] != 'time':
+            raise ValueError('最初の列はtimeにしてください')
+        meta = json.dumps({'dtype': [(name, dtype.fields[name][0].str) for name in dtype.names],
+                           'time_origin': int(time_origin)}).encode('utf-8')
+        header = MAGIC + struct.pack('<II', STORE_VERSION, len(meta)) + meta
+        if len(header) > HEADER_SIZE:
+            raise ValueError('列が多すぎます')
+
+        folder = os.path.dirname(path)
+        if folder != '':
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(header.ljust(HEADER_SIZE, b'\0'))
+        with open(path + INDEX_SUFFIX, 'wb'):
+            pass
+        return cls(path)
+
+    def __len__(self) -> int:
+        # 書き込み途中の最後のレコードは数えない
+        return (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+
+    def records(self) -> np.ndarray:
+        """
+        全てのレコードをメモリマップで返す（コピーオンライトなので書き換えてもファイルは変わらない）
+        @return レコードの配列
+        """
+        count = len(self)
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='c', offset=HEADER_SIZE, shape=(count,))
+
+    def time_index(self) -> np.ndarray:
+        """
+        INDEX_STEP件ごとのtimeを返す（インデックスが追記に追いついていなければ、足りない分をレコードから補う）
+        @return timeの配列（i番目はi * INDEX_STEP件目のレコードのtime）
+        """
+        index = self.__saved_index()
+        needed = -(-len(self) // INDEX_STEP)
+        if len(index) < needed:
+            index = np.concatenate([index, self.__missing_index(len(index))])
+        return index[:needed]
+
+    def __saved_index(self) -> np.ndarray:
+        """.idxファイルに保存済みのインデックス"""
+        index_path = self.path + INDEX_SUFFIX
+        if not os.path.exists(index_path):
+            return np.empty(0, dtype='<i8')
+        return np.fromfile(index_path, dtype='<i8')
+
+    def __missing_index(self, saved: int) -> np.ndarray:
+        """保存済みのインデックスより後のINDEX_STEP件ごとのtime"""
+        return self.records()['time'][saved * INDEX_STEP::INDEX_STEP].astype('<i8')
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        レコードを追記する
+        @param df 追記するデータフレーム（timeは元の時刻で、前のレコードより後のもの）
+        """
+        if len(df) == 0:
+            return
+        count = len(self)
+
+        records = np.empty(len(df), dtype=self.dtype)
+        records['time'] = df['time'].to_numpy() - self.time_origin
+        for name in self.dtype.names[1:]:
+            records[name] = pd.to_numeric(df[name], errors='coerce').to_numpy()
+
+        with open(self.path, 'r+b') as file:
+            # 途中で止まった書き込みの残りがあれば切り捨ててから追記する
+            file.truncate(HEADER_SIZE + count * self.dtype.itemsize)
+            file.seek(0, os.SEEK_END)
+            file.write(records.tobytes())
+
+        # レコードを書き終えてからインデックスを追記する（インデックスが遅れていても読み込みでは補う）
+        saved = len(self.__saved_index())
+        with open(self.path + INDEX_SUFFIX, 'ab') as file:
+            file.write(self.__missing_index(saved).tobytes())
+
+    def bounds(self, start_time: float, end_time: float) -> tuple:
+        """
+        start_time <= time <= end_time のレコードの範囲を求める（timeはtime_originからの経過時間 ms）
+        インデックスで区間を絞ってから、その区間のレコードだけを二分探索する
+        @param start_time 開始時間
+        @param end_time 終了時間
+        @return (開始位置, 終了位置（含まない）)
+        """
+        count = len(self)
+        index = self.time_index()
+        time = self.records()['time'] if count > 0 else np.empty(0, dtype=np.int64)
+
+        def locate(value: float, side: str) -> int:
+            block = max(np.searchsorted(index, value, side=side) - 1, 0)
+            lo = block * INDEX_STEP
+            hi = min(lo + 2 * INDEX_STEP, count)
+            return lo + int(np.searchsorted(time[lo:hi], value, side=side))
+
+        start = locate(start_time, 'left')
+        stop = locate(end_time, 'right')
+        return start, max(start, stop)
+
+    def frame(self, start_time: float = None, end_time: float = None) -> pd.DataFrame:
+        """
+        レコードをデータフレームとして返す（列はメモリマップのビューで、コピーしない）
+        @param start_time 開始時間（Noneなら最初から）
+        @param end_time 終了時間（Noneなら最後まで）
+        @return timeが0から始まるデータフレーム（attrs['time_origin']に基準の時刻）
+        """
+        records = self.records()
+        if start_time is not None or end_time is not None:
+            start, stop = self.bounds(-np.inf if start_time is None else start_time,
+                                      np.inf if end_time is None else end_time)
+            records = records[start:stop]
+        df = pd.DataFrame({name: records[name] for name in self.dtype.names}, copy=False)
+        df.attrs['time_origin'] = self.time_origin
+        return df
+
+
+def store_path(store_dir: str, sensor_name: str) -> str:
+    """センサーのストアのファイルのパスを返す"""
+    return os.path.join(store_dir, sensor_name + STORE_SUFFIX)
+
+
+def open_store(path: str) -> SensorStore | None:
+    """ストアを開く（ファイルが無い場合はNone）"""
+    if not os.path.exists(path):
+        return None
+    return SensorStore(path)
+
+
+def import_csv(csv_path: str, path: str, chunksize: int = 100000, value_dtype: str = '<f8') -> SensorStore:
+    """
+    センサーのcsvをストアに変換する（既にあるストアは作り直す）
+    csvは少しずつ読み込むので、大きいファイルでもメモリは一定
+    @param csv_path csvファイルのパス
+    @param path ストアのファイルのパス
+    @param chunksize 一度に読み込む行数
+    @param value_dtype time以外の列の型
+    @return SensorStore
+    """
+    store = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        if store is None:
+            dtype = [('time', '<i8')] + [(str(column), value_dtype) for column in chunk.columns if column != 'time']
+            store = SensorStore.create(path, dtype, chunk['time'].iloc[0] if len(chunk) > 0 else 0)
+        store.append(chunk)
+
+    if store is None:
+        # ヘッダーだけのcsv
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        store = SensorStore.create(path, [('time', '<i8')] + [(str(column), value_dtype) for column in columns
+                                                              if column != 'time'], 0)
+    return store
+
+
+def import_session(folder: str, store_dir: str, chunksize: int = 100000) -> list:
+    """
+    セッションのフォルダのセンサーのcsv（ans.csv以外）を全てストアに変換する
+    @param folder セッションのフォルダ
+    @param store_dir ストアを置くフォルダ
+    @param chunksize 一度に読み込む行数
+    @return 作成したストアのファイルのパスの一覧
+    """
+    paths = []
+    for file_name in sorted(os.listdir(folder)):
+        if not file_name.endswith('.csv') or file_name.startswith('ans'):
+            continue
+        path = store_path(store_dir, file_name.replace('.csv', ''))
+        import_csv(os.path.join(folder, file_name), path, chunksize=chunksize)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='セッションのセンサーのcsvを追記型のバイナリ形式（../store/）に変換する')
+    parser.add_argument('folders', nargs='*', help='フォルダ名（省略すると../data/以下の全て）')
+    parser.add_argument('--data', default='../data', help='セッションのフォルダがあるフォルダ')
+    parser.add_argument('--store', default='../store', help='ストアを置くフォルダ')
+    parser.add_argument('--chunksize', type=int, default=100000, help='一度に読み込む行数')
+    args = parser.parse_args()
+
+    folder_names = args.folders or [name for name in sorted(os.listdir(args.data))
+                                    if os.path.isdir(os.path.join(args.data, name)) and name != 'output']
+    for folder_name in folder_names:
+        for path in import_session(os.path.join(args.data, folder_name), os.path.join(args.store, folder_name),
+                                   chunksize=args.chunksize):
+            print(path)
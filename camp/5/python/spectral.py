@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sampling import sampling_frequency as estimate_sampling_frequency
+from segments import SegmentIndex, segment_window_starts
+
+# 窓関数の名前と作成する関数
+TAPERS = {
+    'hann': np.hanning,
+    'hamming': np.hamming,
+    'blackman': np.blackman,
+    'bartlett': np.bartlett,
+    'boxcar': np.ones,
+}
+
+
+def make_taper(taper: str | None, window: int) -> np.ndarray:
+    """
+    窓関数を作成する
+    @param taper 窓関数の名前（Noneなら矩形窓）
+    @param window ウィンドウサイズ
+    @return 窓関数の配列
+    """
+    if taper is None:
+        taper = 'boxcar'
+    if taper not in TAPERS:
+        raise ValueError('窓関数は ' + ', '.join(TAPERS) + ' のどれかを指定してください: ' + str(taper))
+    return TAPERS[taper](window)
+
+
+def fft_features(fft_list: pd.DataFrame, window: int, hop: int | None = None, taper: str | None = 'hann',
+                 sampling_frequency: float | None = None, time_scale: float = 1000,
+                 segments: SegmentIndex | None = None) -> pd.DataFrame:
+    """
+    ウィンドウごとに最大の周波数成分（周波数・振幅・位相）を計算する
+    各軸を(ウィンドウ数, window)のビューに並べ替えて、軸ごとに一回だけrfftを行う
+    最後のwindowに満たない行は計算しない
+    @param fft_list データフレーム
+    @param window ウィンドウサイズ（行数）
+    @param hop ウィンドウをずらす行数（Noneならwindowと同じで重なりなし）
+    @param taper 窓関数の名前（hann, hamming, blackman, bartlett, boxcar, None）
+    @param sampling_frequency サンプリング周波数[Hz]（Noneならtimeの間隔の中央値から求める）
+    @param time_scale timeの1秒あたりの値（msなら1000）
+    @param segments 記録の区間（指定すると区間ごとに先頭からウィンドウを並べ、途切れをまたぐウィンドウは計算しない）
+    @return 周波数成分のデータフレーム（indexはウィンドウの先頭の行）
+    """
+    if hop is None:
+        hop = window
+    columns = [column for column in fft_list if column != 'time']
+
+    if segments is None:
+        n_windows = 0 if len(fft_list) < window else (len(fft_list) - window) // hop + 1
+        starts = np.arange(n_windows) * hop
+    else:
+        starts = segment_window_starts(segments, window, hop)
+        n_windows = len(starts)
+    out = pd.DataFrame(index=starts)
+    if n_windows == 0 or window < 2:
+        return out
+
+    if sampling_frequency is None:
+        # 同じデータフレームなら前回の結果を使う
+        sampling_frequency = estimate_sampling_frequency(fft_list, time_scale=time_scale)
+
+    # 振幅は窓関数の総和で正規化する（矩形窓なら N / 2 で割るのと同じ）
+    weights = make_taper(taper, window)
+    scale = weights.sum() / 2
+    freq = np.fft.rfftfreq(window, d=1 / sampling_frequency)
+    # 直流成分とナイキスト周波数を除いた範囲で最大を探す
+    upper = window // 2
+
+    rows = np.arange(n_windows)
+    for column in columns:
+        values = fft_list[column].to_numpy(dtype=np.float64)
+        frames = sliding_window_view(values, window)
+        # 区間が無ければビューのまま間引く（コピーしない）
+        frames = frames[::hop] if segments is None else frames[starts]
+        y_fft = np.fft.rfft(frames * weights, axis=1)
+        amp = np.abs(y_fft) / scale
+
+        if upper > 1:
+            index = np.argmax(amp[:, 1:upper], axis=1) + 1
+        else:
+            index = np.zeros(n_windows, dtype=np.int64)
+
+        out[column + '_fft'] = freq[index]
+        out[column + '_fft_amp'] = amp[rows, index]
+        out[column + '_fft_phase'] = np.angle(y_fft[rows, index])
+
+    return out
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def moving_average(values, window_size: int) -> np.ndarray:
+    """
+    移動平均（rolling(window_size).mean()と同じく、先頭のwindow_size - 1行とNaNを含むウィンドウはNaN）
+    各行をその行までのwindow_size行の和から求めるので、結果はその行のウィンドウの値だけで決まる
+    （rollingは前の行からの累積の和を使うので、途中から計算すると最後の桁が変わる）
+    MakeGraph.low_filterとLowFilterStreamはこれを使うので、データを分けて届けても結果は全く同じになる
+    @param values 値の配列
+    @param window_size ウィンドウサイズ
+    @return 移動平均の配列（float64）
+    """
+    if window_size < 1:
+        raise ValueError('ウィンドウサイズは1以上にしてください: ' + str(window_size))
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window_size:
+        result[window_size - 1:] = sliding_window_view(values, window_size).sum(axis=1) / window_size
+    return result
+
+
+class LowFilterStream:
+    """
+    ローパスフィルタ（移動平均）を少しずつ届くデータに対して行う
+    MakeGraph.low_filterをデータ全体に行った結果と全く同じになる（どちらもmoving_averageを使う、入力のデータフレームは書き換えない）
+    直前のwindow_size - 1行だけを保持するので、メモリはwindow_sizeに比例する
+    @param window_size ウィンドウサイズ
+    """
+
+    def __init__(self, window_size: int):
+        self.window_size = window_size
+        self.tail = None
+
+    def push(self, low_filter_list: pd.DataFrame) -> pd.DataFrame:
+        """
+        データを追加して、フィルタ後のデータを返す
+        @param low_filter_list 追加するデータフレーム
+        @return フィルタ後のデータフレーム（low_filter_listと同じ行）
+        """
+        if self.tail is None or len(self.tail) == 0:
+            joined = low_filter_list
+        else:
+            joined = pd.concat([self.tail, low_filter_list])
+
+        tmp_list = low_filter_list.copy()
+        for column in low_filter_list:
+            if column == 'time':
+                continue
+            filtered = moving_average(joined[column].to_numpy(), self.window_size)
+            tmp_list[column] = filtered[len(joined) - len(low_filter_list):]
+
+        # 次のデータの先頭のウィンドウに必要な行だけを残す
+        keep = min(max(self.window_size - 1, 0), len(joined))
+        self.tail = joined.iloc[len(joined) - keep:]
+        return tmp_list
+
+
+class DiffStream:
+    """
+    微分（前の行との差）を少しずつ届くデータに対して行う
+    MakeGraph.diffをデータ全体に行った結果と同じになる（入力のデータフレームは書き換えない）
+    直前の1行だけを保持する
+    """
+
+    def __init__(self):
+        self.last = None
+
+    def push(self, diff_list: pd.DataFrame) -> pd.DataFrame:
+        """
+        データを追加して、微分後のデータを返す
+        @param diff_list 追加するデータフレーム
+        @return 微分後のデータフレーム（diff_listと同じ行）
+        """
+        tmp_list = diff_list.copy()
+        for column in diff_list:
+            if column == 'time':
+                continue
+            tmp_list[column] = diff_list[column].diff()
+            if self.last is not None and len(diff_list) > 0:
+                # 先頭の行は前のデータの最後の行との差にする
+                tmp_list.iloc[0, tmp_list.columns.get_loc(column)] = diff_list[column].iloc[0] - self.last[column]
+
+        if len(diff_list) > 0:
+            self.last = diff_list.iloc[-1]
+        return tmp_list
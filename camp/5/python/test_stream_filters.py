@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Graphs import MakeGraph
+from stream_filters import DiffStream, LowFilterStream, moving_average
+
+
+def sample_frame(rows: int = 20000) -> pd.DataFrame:
+    """値が大きく（5e4前後）、NaNを含むデータ（rollingの累積の和では最後の桁が変わりやすい）"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'time': np.arange(rows) * 10,
+        'x': 5e4 + rng.normal(0, 100, rows),
+        'y': rng.integers(0, 1000, rows),
+    })
+    df.loc[[rows // 40, rows // 40 + 1, rows // 2], 'x'] = np.nan
+    return df
+
+
+def push_all(stream, df: pd.DataFrame, chunksize: int) -> pd.DataFrame:
+    return pd.concat([stream.push(df.iloc[i:i + chunksize]) for i in range(0, len(df), chunksize)])
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 24, 25, 26, 1000])
+def test_low_filter_stream_is_bit_identical(chunksize):
+    # 1行ずつ渡すと遅いので、小さいchunksizeは行数を減らす（どちらもウィンドウの何十倍もある）
+    df = sample_frame(1000 if chunksize < 10 else 20000)
+    expected = MakeGraph.low_filter(None, df.copy(), 25)
+    actual = push_all(LowFilterStream(25), df, chunksize)
+    pd.testing.assert_index_equal(actual.index, df.index)
+    # 許容誤差なしで同じ値になる
+    for column in ['time', 'x', 'y']:
+        assert np.array_equal(actual[column].to_numpy(), expected[column].to_numpy(), equal_nan=True), column
+
+
+def test_low_filter_stream_keeps_input():
+    df = sample_frame(100)
+    before = df.copy()
+    push_all(LowFilterStream(5), df, 10)
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_moving_average_matches_rolling():
+    values = sample_frame()['x']
+    expected = values.rolling(25).mean().to_numpy()
+    actual = moving_average(values.to_numpy(), 25)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-14)
+
+
+@pytest.mark.parametrize('chunksize', [1, 3, 1000])
+def test_diff_stream_matches_batch(chunksize):
+    df = sample_frame(500)
+    expected = MakeGraph.diff(None, df.copy())
+    actual = push_all(DiffStream(), df, chunksize)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
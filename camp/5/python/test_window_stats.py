@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from window_stats import calc_window_stats
+from segments import find_segments
+
+
+def calc_loop(calc_list: pd.DataFrame, filter_num: float) -> pd.DataFrame:
+    """
+    ベクトル化する前のMakeGraph.calc（1行ずつのループ）
+    元の実装はfirst_time・first_indexを軸ごとに戻していなかったので、ここでは軸ごとに最初から数える
+    （calc_window_statsは全ての軸で、元の実装のxの軸と同じウィンドウを使う）
+    """
+    tmp_list = pd.DataFrame()
+    start_time = calc_list['time'][0]
+    names = ['mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+    def stats(column: str, i: int, first_index: int) -> list:
+        values = calc_list[column][first_index:i]
+        return [values.mean(), values.std(), values.min(), values.quantile(0.25), values.quantile(0.5),
+                values.quantile(0.75), values.max()]
+
+    for column in calc_list:
+        if column == 'time':
+            continue
+        first_time = calc_list['time'][0] - start_time
+        first_index = 0
+        for i in range(0, len(calc_list)):
+            if i < len(calc_list) - 1 and calc_list['time'][i + 1] - calc_list['time'][i] > filter_num:
+                for name, value in zip(names, stats(column, i, first_index)):
+                    tmp_list.loc[i, column + '_' + name] = value
+                tmp_list.loc[i, column + '_first_time'] = first_time
+                tmp_list.loc[i, column + '_finish_time'] = calc_list['time'][i] - start_time
+                for name in names:
+                    tmp_list.loc[i + 1, column + '_' + name] = 0
+                tmp_list.loc[i + 1, column + '_first_time'] = calc_list['time'][i] - start_time
+                tmp_list.loc[i + 1, column + '_finish_time'] = calc_list['time'][i + 1] - start_time
+                first_time = calc_list['time'][i + 1] - start_time
+                first_index = i + 1
+                continue
+
+            if first_time + filter_num > calc_list['time'][i] - start_time:
+                if i != len(calc_list) - 1:
+                    continue
+
+            for name, value in zip(names, stats(column, i, first_index)):
+                tmp_list.loc[i, column + '_' + name] = value
+            tmp_list.loc[i, column + '_first_time'] = first_time
+            tmp_list.loc[i, column + '_finish_time'] = calc_list['time'][i] - start_time
+            first_time = calc_list['time'][i] - start_time
+            first_index = i
+    return tmp_list
+
+
+def sensor_frame(seed: int, rows: int = 200) -> pd.DataFrame:
+    """記録の途切れ・同じ時刻の行を含むセンサーのデータ"""
+    rng = np.random.default_rng(seed)
+    dt = rng.choice([0, 10, 20, 30, 50, 400, 3000], size=rows - 1, p=[.05, .3, .3, .15, .1, .07, .03])
+    time = np.concatenate([[rng.integers(0, 1000)], dt]).cumsum()
+    return pd.DataFrame({
+        'time': time.astype(np.int64),
+        'x': rng.normal(0, 1, rows),
+        'y': rng.normal(5, 2, rows),
+        'z': rng.integers(-3, 3, rows).astype(np.float64),
+    })
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('filter_num', [50, 200, 1000])
+def test_calc_matches_loop(seed, filter_num):
+    df = sensor_frame(seed)
+    expected = calc_loop(df, filter_num)
+    actual = calc_window_stats(df, filter_num)
+    assert sorted(actual.columns) == sorted(expected.columns)
+    # 行・列・0の行は全く同じで、平均・標準偏差は和を求める順番が違うので最後の桁だけ変わることがある
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, check_index_type=False,
+                                  rtol=1e-12)
+
+
+def test_calc_uses_given_segments():
+    df = sensor_frame(0)
+    expected = calc_window_stats(df, 200)
+    actual = calc_window_stats(df, 200, segments=find_segments(df['time'].to_numpy(), 200))
+    pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from test_window_stats import sensor_frame
+from window_stats import calc_window_stats
+from window_stream import WindowStatsStream, iter_window_stats
+
+
+def stream_stats(df: pd.DataFrame, filter_num: float, chunksize: int) -> pd.DataFrame:
+    """WindowStatsStreamにchunksize行ずつ渡した結果をつなげる"""
+    stream = WindowStatsStream(filter_num)
+    frames = [stream.push(df.iloc[i:i + chunksize]) for i in range(0, len(df), chunksize)]
+    frames.append(stream.close())
+    return pd.concat([frame for frame in frames if len(frame) > 0])
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('filter_num', [50, 200, 1000])
+@pytest.mark.parametrize('chunksize', [1, 2, 7, 64, 1000])
+def test_stream_matches_batch(seed, filter_num, chunksize):
+    df = sensor_frame(seed)
+    expected = calc_window_stats(df, filter_num)
+    actual = stream_stats(df, filter_num, chunksize)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False)
+
+
+def test_iter_window_stats_matches_batch(tmp_path):
+    df = sensor_frame(1, rows=1000)
+    file_path = tmp_path / 'acc.csv'
+    df.to_csv(file_path, index=False)
+    expected = calc_window_stats(pd.read_csv(file_path), 200)
+    actual = pd.concat(iter_window_stats(str(file_path), 200, chunksize=97))
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from frame_memo import FrameMemo
+
+# データフレームごとのtimeが昇順かどうか
+_sorted_cache = FrameMemo()
+
+
+def is_time_sorted(df: pd.DataFrame) -> bool:
+    """
+    timeの列が昇順かどうかを返す
+    データフレームごとに一度だけ調べ、行数や最初・最後の時刻が変わっていれば調べ直す
+    途中の行のtimeをその場で並べ替えた場合は検出できないので、invalidate_sortedを呼ぶ
+    @param df データフレーム
+    @return 昇順ならTrue
+    """
+    time = df['time'].to_numpy()
+    return _sorted_cache.get(df, time, lambda: bool(len(time) < 2 or (time[1:] >= time[:-1]).all()))
+
+
+def invalidate_sorted(df: pd.DataFrame) -> None:
+    """is_time_sortedの結果を捨てる（timeをその場で書き換えたときに使う）"""
+    _sorted_cache.invalidate(df)
+
+
+def time_bounds(time: np.ndarray, start_times, end_times) -> tuple:
+    """
+    start_time <= time <= end_time の行の範囲を二分探索で求める
+    start_times, end_timesは配列でもよく、その場合はまとめて求める
+    @param time 時間の配列（昇順）
+    @param start_times 開始時間
+    @param end_times 終了時間
+    @return (開始位置, 終了位置（含まない）)
+    """
+    lo = np.searchsorted(time, start_times, side='left')
+    hi = np.searchsorted(time, end_times, side='right')
+    return lo, np.maximum(hi, lo)
+
+
+def time_range(df: pd.DataFrame, start_time: float, end_time: float) -> pd.DataFrame:
+    """
+    start_time <= time <= end_time の行を返す
+    timeが昇順なら二分探索で位置を求めて、コピーせずに位置で切り出す
+    @param df データフレーム
+    @param start_time 開始時間
+    @param end_time 終了時間
+    @return 切り出したデータフレーム
+    """
+    if not is_time_sorted(df):
+        return df[(df['time'] >= start_time) & (df['time'] <= end_time)]
+    lo, hi = time_bounds(df['time'].to_numpy(), start_time, end_time)
+    return df.iloc[int(lo):int(hi)]
+
+
+def time_ranges(df: pd.DataFrame, start_times, end_times) -> list:
+    """
+    複数の時間の範囲の行をまとめて切り出す（ans.csvの行ごとのイベントなど）
+    二分探索は全ての範囲で一度に行い、切り出しはコピーしない
+    @param df データフレーム（timeは昇順）
+    @param start_times 開始時間の配列
+    @param end_times 終了時間の配列
+    @return 範囲ごとのデータフレームのリスト
+    """
+    if not is_time_sorted(df):
+        raise ValueError('timeが昇順ではありません')
+    lo, hi = time_bounds(df['time'].to_numpy(), np.asarray(start_times), np.asarray(end_times))
+    return [df.iloc[start:stop] for start, stop in zip(lo.tolist(), hi.tolist())]
+
+
+def gather_time_ranges(df: pd.DataFrame, start_times, end_times) -> pd.DataFrame:
+    """
+    複数の時間の範囲の行を1つのデータフレームにまとめる
+    行の位置をまとめて作り一度だけ取り出すので、出力の大きさに比例した時間で済む
+    @param df データフレーム（timeは昇順）
+    @param start_times 開始時間の配列
+    @param end_times 終了時間の配列
+    @return 範囲の番号の列（range）を先頭に加えたデータフレーム（indexは元のまま）
+    """
+    if not is_time_sorted(df):
+        raise ValueError('timeが昇順ではありません')
+    lo, hi = time_bounds(df['time'].to_numpy(), np.asarray(start_times), np.asarray(end_times))
+    lengths = hi - lo
+    total = int(lengths.sum())
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.arange(total) - np.repeat(offsets, lengths) + np.repeat(lo, lengths)
+
+    out = df.iloc[positions]
+    out.insert(0, 'range', np.repeat(np.arange(len(lengths)), lengths))
+    return out
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from segments import SegmentIndex, find_segments
+
+# calcが出力する統計量の並び（列名の接尾辞）
+STAT_NAMES = ['mean', 'std', 'min', '25%', '50%', '75%', 'max']
+TIME_NAMES = ['first_time', 'finish_time']
+
+
+def find_windows(time: np.ndarray, filter_num: float, segments: SegmentIndex | None = None):
+    """
+    ウィンドウの区切りと記録の途切れ（ギャップ）を求める
+    MakeGraph.calcの逐次処理と同じ区切り方をする
+      - 窓の先頭からfilter_num以上経過した最初の行で窓を閉じる（その行は次の窓の先頭）
+      - 隣の行との時間差がfilter_numより大きい行はギャップとして窓を閉じ、次の行に0の行を置く
+      - 最後の行では必ず窓を閉じる
+    @param time 時間の配列（昇順）
+    @param filter_num ウィンドウの長さ（timeと同じ単位）
+    @param segments thresholdがfilter_numのSegmentIndex（Noneならここで求める）
+    @return (行ラベル, 開始位置, 終了位置（含まない）, 開始時間の位置, 終了時間の位置, 0の行かどうか)
+    """
+    n = len(time)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty, np.empty(0, dtype=bool)
+
+    # 各行から見て次に窓を閉じる行を二分探索でまとめて求める
+    next_index = np.searchsorted(time, time + filter_num, side='left')
+    next_index = np.maximum(next_index, np.arange(1, n + 1))
+
+    # 時間差がfilter_numより大きい行（ギャップ）は区間の一覧から取り出す
+    if segments is None or segments.threshold != filter_num:
+        segments = find_segments(time, filter_num)
+    gap_index = segments.gap_positions().astype(np.int64)
+    segment_starts = np.concatenate([[0], gap_index + 1])
+    segment_ends = np.append(gap_index, n - 1)
+
+    # 区間の先頭から次に窓を閉じる行をたどった行（窓の区切り）を求める
+    # 区間の終わりを越える行は区間の終わりにまとめ、区間の終わりはそこで止まる（動かない）ようにしておき、
+    # 「1回・2回・4回…たどった先」の表を倍にしながら、たどり着いた行の印を広げる（1行ずつたどるループを使わない）
+    jump = np.minimum(next_index, segment_ends[np.searchsorted(segment_ends, np.arange(n), side='left')])
+    jump[segment_ends] = segment_ends
+    visited = np.zeros(n, dtype=bool)
+    visited[segment_starts] = True
+    while True:
+        reached = visited.copy()
+        reached[jump[visited]] = True
+        if np.array_equal(reached, visited):
+            break
+        visited = reached
+        jump = jump[jump]
+    boundaries = np.flatnonzero(visited)
+
+    # 区間の先頭以外の区切りの行で、前の区切りから始まる窓を閉じる
+    closing = ~np.isin(boundaries, segment_starts)
+    labels = [boundaries[closing]]
+    firsts = [boundaries[np.flatnonzero(closing) - 1]]
+    zeros = [np.zeros(len(labels[0]), dtype=bool)]
+
+    # 1行だけの区間は、その行だけの窓にする
+    single = segment_starts[segment_starts == segment_ends]
+    labels.append(single)
+    firsts.append(single)
+    zeros.append(np.zeros(len(single), dtype=bool))
+
+    # ギャップの次の行に0の行を置く（1行だけの区間の窓と同じ行になる場合は窓の方を使う、元の.locの上書きと同じ）
+    gap_rows = gap_index + 1
+    gap_rows = gap_rows[~np.isin(gap_rows, single)]
+    labels.append(gap_rows)
+    firsts.append(gap_rows - 1)
+    zeros.append(np.ones(len(gap_rows), dtype=bool))
+
+    labels = np.concatenate(labels)
+    firsts = np.concatenate(firsts)
+    zeros = np.concatenate(zeros)
+    order = np.argsort(labels, kind='stable')
+    labels, firsts, zeros = labels[order], firsts[order], zeros[order]
+    # 0の行は値を持たず（開始位置 = 終了位置 = その行）、時間は直前の行からその行まで
+    starts = np.where(zeros, labels, firsts)
+    return labels, starts, labels.copy(), firsts, labels.copy(), zeros
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """np.quantileと同じ線形補間"""
+    diff_b_a = b - a
+    return np.where(t >= 0.5, b - diff_b_a * (1 - t), a + diff_b_a * t)
+
+
+def segment_stats(values: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """
+    区間ごとの平均・標準偏差・最小値・四分位数・最大値をまとめて計算する
+    NaNはpandasと同じく除外する
+    @param values 値の配列
+    @param starts 区間の開始位置
+    @param stops 区間の終了位置（含まない）
+    @return (区間数, 7)の配列（並びはSTAT_NAMES）
+    """
+    k = len(starts)
+    out = np.full((k, len(STAT_NAMES)), np.nan)
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if k == 0 or total == 0:
+        return out
+
+    # 区間の値を一列に並べ、区間番号と値で並べ替える（NaNは区間の末尾に来る）
+    offsets = np.cumsum(lengths) - lengths
+    segment = np.repeat(np.arange(k), lengths)
+    position = np.arange(total) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+    v = values[position].astype(np.float64)
+    sorted_v = v[np.lexsort((v, segment))]
+
+    valid = ~np.isnan(v)
+    count = np.bincount(segment, weights=valid, minlength=k)
+    has_value = count > 0
+
+    # 平均と標準偏差（不偏）
+    sums = np.bincount(segment, weights=np.where(valid, v, 0.0), minlength=k)
+    mean = np.divide(sums, count, out=np.full(k, np.nan), where=has_value)
+    dev = np.where(valid, v - mean[segment], 0.0)
+    var = np.divide(np.bincount(segment, weights=dev * dev, minlength=k), count - 1,
+                    out=np.full(k, np.nan), where=count > 1)
+    out[:, 0] = mean
+    out[:, 1] = np.sqrt(var)
+
+    # 最小値・四分位数・最大値は並べ替え済みの配列から位置で取り出す
+    base = offsets[has_value]
+    last = count[has_value].astype(np.int64) - 1
+    out[has_value, 2] = sorted_v[base]
+    for column, q in zip((3, 4, 5), (0.25, 0.5, 0.75)):
+        h = last * q
+        lo = np.floor(h).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        out[has_value, column] = _lerp(sorted_v[base + lo], sorted_v[base + hi], h - lo)
+    out[has_value, 6] = sorted_v[base + last]
+
+    return out
+
+
+def stats_frame(calc_list: pd.DataFrame, columns: list, windows: tuple, start_time: float,
+                label_offset: int = 0) -> pd.DataFrame:
+    """
+    find_windowsで求めたウィンドウごとの統計量をデータフレームにする
+    @param calc_list データフレーム
+    @param columns 統計量を計算する列
+    @param windows find_windowsの戻り値
+    @param start_time 時間の基準（first_time, finish_timeはこの時間からの経過時間になる）
+    @param label_offset 行ラベルに足す値（calc_listが途中の行から始まる場合に使う）
+    @return ウィンドウごとの統計量のデータフレーム
+    """
+    labels, starts, stops, first_pos, finish_pos, zero = windows
+    time = calc_list['time'].to_numpy()
+
+    # 結果は最初に確保した配列に書き込む
+    width = len(STAT_NAMES) + len(TIME_NAMES)
+    out = np.empty((len(labels), len(columns) * width))
+    first_time = time[first_pos] - start_time
+    finish_time = time[finish_pos] - start_time
+
+    for index, column in enumerate(columns):
+        block = out[:, index * width:(index + 1) * width]
+        block[:, :len(STAT_NAMES)] = segment_stats(calc_list[column].to_numpy(), starts, stops)
+        block[zero, :len(STAT_NAMES)] = 0
+        block[:, len(STAT_NAMES)] = first_time
+        block[:, len(STAT_NAMES) + 1] = finish_time
+
+    return pd.DataFrame(out, index=labels + label_offset, columns=stats_columns(columns))
+
+
+def stats_columns(columns: list) -> list:
+    """統計量の列名（x_mean, x_std, ..., x_finish_time, y_mean, ...）を返す"""
+    return [column + '_' + name for column in columns for name in STAT_NAMES + TIME_NAMES]
+
+
+def calc_window_stats(calc_list: pd.DataFrame, filter_num: float,
+                      segments: SegmentIndex | None = None) -> pd.DataFrame:
+    """
+    平均・分散・最大値・最小値・中央値・四分位数・標準偏差をウィンドウごとに計算する
+    MakeGraph.calcと同じ列（x_mean, x_25%, x_first_time, ...）を返す
+    @param calc_list データフレーム
+    @param filter_num ウィンドウの長さ（timeと同じ単位）
+    @param segments thresholdがfilter_numのSegmentIndex（Noneならここで求める）
+    @return ウィンドウごとの統計量のデータフレーム
+    """
+    columns = [column for column in calc_list if column != 'time']
+    time = calc_list['time'].to_numpy()
+    windows = find_windows(time, filter_num, segments=segments)
+    start_time = time[0] if len(time) > 0 else 0
+    return stats_frame(calc_list, columns, windows, start_time)
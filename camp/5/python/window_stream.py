@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from window_stats import find_windows, stats_columns, stats_frame
+
+
+class WindowStatsStream:
+    """
+    データを少しずつ受け取り、確定したウィンドウの統計量を返す
+    MakeGraph.calc（calc_window_stats）を全データに対して実行した結果と同じ行・値になる
+    保持するのはまだ閉じていないウィンドウの行だけなので、記録の長さに関係なくメモリは一定
+    @param filter_num ウィンドウの長さ（timeと同じ単位）
+    """
+
+    def __init__(self, filter_num: float):
+        self.filter_num = filter_num
+        self.columns = None
+        self.start_time = None
+        # まだ閉じていないウィンドウの行と、その先頭の行番号
+        self.buffer = None
+        self.offset = 0
+        # ギャップの次の行に置く0の行（次の行を見るまで上書きされるかわからない）
+        self.pending = None
+
+    def push(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        データを追加して、確定したウィンドウの統計量を返す
+        @param chunk 追加するデータフレーム（timeは前のデータの続き）
+        @return 確定したウィンドウの統計量のデータフレーム
+        """
+        if self.columns is None:
+            self.columns = [column for column in chunk if column != 'time']
+            self.buffer = chunk.iloc[:0][['time'] + self.columns]
+            if len(chunk) > 0:
+                self.start_time = chunk['time'].iloc[0]
+
+        chunk = chunk[['time'] + self.columns]
+        if len(self.buffer) == 0:
+            self.buffer = chunk.reset_index(drop=True)
+        else:
+            self.buffer = pd.concat([self.buffer, chunk], ignore_index=True)
+        if self.start_time is None and len(self.buffer) > 0:
+            self.start_time = self.buffer['time'].iloc[0]
+        return self.emit(final=False)
+
+    def close(self) -> pd.DataFrame:
+        """
+        データの終わりとして残りのウィンドウを閉じ、その統計量を返す
+        @return 残りのウィンドウの統計量のデータフレーム
+        """
+        return self.emit(final=True)
+
+    def emit(self, final: bool) -> pd.DataFrame:
+        """
+        バッファのうち確定したウィンドウの統計量を計算し、閉じたウィンドウの行をバッファから捨てる
+        最後の行はギャップかどうかが次の行を見るまでわからないので、finalでなければ確定しない
+        @param final データの終わりかどうか
+        @return 確定したウィンドウの統計量のデータフレーム
+        """
+        if self.columns is None or len(self.buffer) == 0:
+            return pd.DataFrame(columns=stats_columns(self.columns or []))
+
+        length = len(self.buffer)
+        windows = find_windows(self.buffer['time'].to_numpy(), self.filter_num)
+        labels = windows[0]
+        done = np.ones(len(labels), dtype=bool) if final else labels <= length - 2
+
+        frames = []
+        # 前回の0の行は、バッファの先頭の行が上書きされなければ確定する
+        if self.pending is not None and (final or length >= 2):
+            if not np.any(labels[done] == 0):
+                frames.append(self.pending)
+            self.pending = None
+        frames.append(stats_frame(self.buffer, self.columns, tuple(a[done] for a in windows),
+                                  self.start_time, self.offset))
+
+        if final:
+            self.buffer = self.buffer.iloc[:0]
+            self.offset += length
+        else:
+            # 最後の行のウィンドウはまだ閉じていないので、その先頭から残す
+            last = np.flatnonzero(labels == length - 1)[0]
+            open_start = int(windows[1][last])
+            time = self.buffer['time'].to_numpy()
+            if length >= 2 and time[-1] - time[-2] > self.filter_num:
+                # 最後の行の前がギャップなら、最後の行には0の行を置く
+                zero_row = (np.array([length - 1]), np.array([length - 1]), np.array([length - 1]),
+                            np.array([length - 2]), np.array([length - 1]), np.array([True]))
+                self.pending = stats_frame(self.buffer, self.columns, zero_row, self.start_time, self.offset)
+            self.buffer = self.buffer.iloc[open_start:].reset_index(drop=True)
+            self.offset += open_start
+
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+
+def iter_window_stats(file_path: str, filter_num: float, chunksize: int = 100000):
+    """
+    センサーのCSVを少しずつ読み込み、確定したウィンドウの統計量を順に返す
+    全ての結果をつなげるとMakeGraph.calcの結果と同じになる
+    @param file_path CSVファイルのパス
+    @param filter_num ウィンドウの長さ（timeと同じ単位）
+    @param chunksize 一度に読み込む行数
+    @return ウィンドウの統計量のデータフレームを返すジェネレータ
+    """
+    stream = WindowStatsStream(filter_num)
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        info_df = stream.push(chunk)
+        if len(info_df) > 0:
+            yield info_df
+
+    info_df = stream.close()
+    if len(info_df) > 0:
+        yield info_df
@@ -1,27 +1,28 @@
-import csv
+import numpy as np
+import pandas as pd
 
 def calculate_sampling_frequency(csv_file):
-    with open(csv_file, 'r') as file:
-        reader = csv.reader(file)
-        # スキップ: ヘッダ行
-        next(reader)
-        # 1行目の時間を取得
-        prev_time = float(next(reader)[0])
-        # サンプル間隔のリストを初期化
-        time_diffs = []
+    """
+    サンプリング周波数[Hz]を求める（時間は秒）
+    camp/5/python/sampling.pyのsampling_frequency(csv_file, time_scale=1)と同じ推定（正の間隔の中央値）
+    このフォルダは他のフォルダを読み込まずに単体で実行するスクリプトなので、同じ処理をここに書いている
+    （推定の方法を変えるときは、camp/4/python, study/mahjanのsampling.pyと一緒に変える）
+    """
+    # 1列目（時間）だけを読み込む
+    time = pd.read_csv(csv_file, usecols=[0]).iloc[:, 0].to_numpy(dtype=np.float64)
+    # サンプル間隔の配列
+    time_diffs = np.diff(time)
+    time_diffs = time_diffs[np.isfinite(time_diffs) & (time_diffs > 0)]
 
-        for row in reader:
-            time = float(row[0])
-            time_diff = time - prev_time
-            time_diffs.append(time_diff)
-            prev_time = time
+    if len(time_diffs) == 0:
+        return np.nan
 
-        # サンプリング周波数の計算
-        average_time_diff = sum(time_diffs) / len(time_diffs)
-        sampling_frequency = 1.0 / average_time_diff
+    # サンプリング周波数の計算（中央値なので記録の途切れがあってもずれない）
+    median_time_diff = np.median(time_diffs)
+    sampling_frequency = 1.0 / median_time_diff
 
-        return sampling_frequency
+    return sampling_frequency
 
 csv_file = './study/fft/acc.csv'
 sampling_frequency = calculate_sampling_frequency(csv_file)
-print(f"サンプリング周波数: {sampling_frequency} Hz")
\ No newline at end of file
+print(f"サンプリング周波数: {sampling_frequency} Hz")
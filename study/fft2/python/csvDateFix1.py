@@ -1,25 +1,36 @@
-import csv
-from datetime import datetime
+import os
+import shutil
+import tempfile
 
+import pandas as pd
+
+# camp/5/python/csvFix.pyのconvert_fileと同じ変換
+# （このフォルダだけで動くように、他のフォルダのモジュールは読み込まない）
 input_file = "study/fft2/data/3回目/ans.csv"
 output_file = "study/fft2/data/3回目/ans.csv"
 
 datetime_format = "%Y-%m-%dT%H:%M:%S.%fZ"
+# アプリが出力する時刻は末尾にZが付いているが、実際は日本時間（日本時間のPCでdatetime.timestamp()を使った結果と同じにする）
+timezone = "Asia/Tokyo"
 
-with open(input_file, "r", newline="") as file:
-    reader = csv.DictReader(file)
-    rows = list(reader)
-
-    for row in rows:
-        datetime_str = row["time"]
-        datetime_obj = datetime.strptime(datetime_str, datetime_format)
-        absolute_time_ms = int(datetime_obj.timestamp() * 1000)
-        row["time"] = absolute_time_ms
-
-with open(output_file, "w", newline="") as file:
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(file, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(rows)
+# time以外の列はそのまま書き戻すため、全て文字列として読み込む
+df = pd.read_csv(input_file, dtype=str, keep_default_na=False, encoding="utf-8")
+if pd.to_numeric(df["time"], errors="coerce").notna().all():
+    # 既にUNIX時間（ms）になっているので、変換せずに出力先へそのままコピーする
+    if os.path.abspath(input_file) != os.path.abspath(output_file):
+        shutil.copyfile(input_file, output_file)
+    print("変換不要（timeは既にUNIX時間です）: " + output_file)
+else:
+    datetime_obj = pd.to_datetime(df["time"], format=datetime_format).dt.tz_localize(timezone)
+    df["time"] = (datetime_obj - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
 
-print("変換が完了しました。")
\ No newline at end of file
+    # 一時ファイルに書き込んでから置き換えるので、途中で止まっても元のファイルは壊れない
+    fd, tmp_path = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as file:
+            df.to_csv(file, index=False)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print("変換が完了しました。")
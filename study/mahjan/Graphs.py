@@ -1,3 +1,4 @@
+import logging
 import os
 
 import pandas as pd
@@ -6,6 +7,10 @@ from matplotlib import pyplot as plt
 from enum import Enum
 from typing import List
 
+from sampling import sampling_frequency
+
+logger = logging.getLogger(__name__)
+
 
 class GraphViewOptions(Enum):
     low_filter = 'low_filter'
@@ -48,7 +53,7 @@ class MakeGraph:
             df_tmp = pd.read_csv(os.path.join(self.folder_name, file_name))
             file_type = file_name.replace('.csv', '')
 
-            print(file_name)
+            logger.info('%s: %s', self.folder_name, file_name)
             # 時間を0から始める
             df_tmp['time'] = (df_tmp['time'] - df_tmp['time'][0]) / 1000
 
@@ -168,9 +173,8 @@ class MakeGraph:
             case _:  # GraphAxis.x, GraphAxis.y, GraphAxis.z, GraphAxis.rssi, GraphAxis.bpm
                 try:
                     ax.plot(ax_list['time'], ax_list[axis.value], label=axis.value)
-                except:
-                    print('その軸は存在しません')
-                    pass
+                except KeyError:
+                    logger.warning('その軸は存在しません: %s', axis.value)
         ax.legend()
 
         # 色付け
@@ -235,6 +239,9 @@ class MakeGraph:
     """
     def __fft(self, fft_list: pd.DataFrame, filter_num: int) -> pd.DataFrame:
         tmp_list = pd.DataFrame()
+        # サンプリング周波数はtimeの列から一度だけ求める
+        sampling_frequency = self.calculate_sampling_frequency(fft_list)
+        dt = 1 / sampling_frequency  # サンプリング間隔
 
         # window_sizeで指定した範囲で計算して、終わったら、次の範囲に移動する
         for i in range(0, len(fft_list), filter_num):
@@ -244,7 +251,6 @@ class MakeGraph:
                 # FFTを計算
 
                 N = len(fft_list[column][i:i + filter_num])  # サンプル数
-                dt = 1 / self.calculate_sampling_frequency(fft_list[column][i:i + filter_num])  # サンプリング間隔
 
                 y_fft = np.fft.fft(fft_list[column][i:i + filter_num])  # 離散フーリエ変換
                 freq = np.fft.fftfreq(N, d=dt)  # 周波数を割り当てる（※後述）
@@ -263,7 +269,7 @@ class MakeGraph:
                 tmp_list.loc[i, column + '_fft_phase'] = np.angle(y_fft[index])
 
                 # 最大の周波数成分の周波数を取得
-                tmp_list.loc[i, column + '_fft_freq'] = freq[index] * self.calculate_sampling_frequency(fft_list[column][i:i + filter_num])
+                tmp_list.loc[i, column + '_fft_freq'] = freq[index] * sampling_frequency
 
 
         return tmp_list
@@ -296,7 +302,10 @@ class MakeGraph:
 
     """
     サンプリング周波数を計算する
+    timeの間隔の中央値から求めるので、記録の途切れやフィルタで抜けた行があってもずれない
+    位置で計算するので、indexが0から始まらないデータフレームでもよい
+    @param data データフレーム、またはtimeのSeries（timeは秒）
+    @return サンプリング周波数[Hz]
     """
-    def calculate_sampling_frequency(self,data: pd.DataFrame) -> float:
-        dt = data['time'].diff().mean()
-        return 1 / dt
+    def calculate_sampling_frequency(self, data) -> float:
+        return sampling_frequency(data, time_scale=1)
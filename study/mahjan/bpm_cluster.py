@@ -0,0 +1,173 @@
+import argparse
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+from test3 import identify_extreme_clusters, perform_clustering, read_csv_data
+
+logger = logging.getLogger(__name__)
+
+# 1つの対局のフォルダの中の席
+SEATS = ['east', 'south', 'west', 'north']
+# 出力する表の列
+COLUMNS = ['game', 'seat', 'row', 'time', 'bpm', 'bpm_scaled', 'cluster', 'high_cluster', 'low_cluster']
+
+
+def find_bpm_files(data_dir: str = './data') -> list:
+    """
+    全ての対局・席の心拍数のcsvを探す
+    @param data_dir 対局のフォルダがあるフォルダ
+    @return (対局の番号, 席, ファイルのパス) の一覧（対局の番号・席の順）
+    """
+    files = []
+    for file_path in glob.glob(os.path.join(data_dir, '*', '*_bpm.csv')):
+        game = os.path.basename(os.path.dirname(file_path))
+        seat = os.path.basename(file_path)[:-len('_bpm.csv')]
+        files.append((game, seat, file_path))
+
+    def order(item: tuple) -> tuple:
+        game, seat, _ = item
+        return (int(game) if game.isdigit() else float('inf'), game,
+                SEATS.index(seat) if seat in SEATS else len(SEATS), seat)
+
+    return sorted(files, key=order)
+
+
+def standardize(bpm: np.ndarray) -> np.ndarray:
+    """1人分の心拍数を標準化する（StandardScalerと同じ、ばらつきが0なら0にする）"""
+    bpm = bpm.astype(np.float64)
+    std = bpm.std()
+    return (bpm - bpm.mean()) / (std if std > 0 else 1.0)
+
+
+def _load_file(file_path: str, num_clusters: int) -> pd.DataFrame | None:
+    """
+    心拍数のcsvを読み込む
+    行数がクラスタの数より少ないファイルはクラスタリングできないので、どちらの方法でも使わない
+    @return データフレーム（使わない場合はNone）
+    """
+    data = read_csv_data(file_path).dropna(subset=['bpm']).reset_index(drop=True)
+    if len(data) < num_clusters:
+        logger.info('行数が%d行でクラスタの数より少ないので使いません: %s', len(data), file_path)
+        return None
+    return data
+
+
+def _tidy(game: str, seat: str, data: pd.DataFrame) -> pd.DataFrame:
+    """クラスタを付けたデータフレームを出力する表の形にする"""
+    high_cluster, low_cluster = identify_extreme_clusters(data)
+    return pd.DataFrame({
+        'game': game,
+        'seat': seat,
+        'row': np.arange(len(data)),
+        'time': data['time'].to_numpy(),
+        'bpm': data['bpm'].to_numpy(),
+        'bpm_scaled': standardize(data['bpm'].to_numpy()),
+        'cluster': data['cluster'].to_numpy(),
+        'high_cluster': high_cluster,
+        'low_cluster': low_cluster,
+    }, columns=COLUMNS)
+
+
+def cluster_file(task: tuple) -> pd.DataFrame:
+    """
+    1つの対局・席の心拍数をtest3.pyと同じ方法（標準化してKMeans）でクラスタリングする
+    @param task (対局の番号, 席, ファイルのパス, クラスタの数)
+    @return 1行1サンプルのデータフレーム（データが無ければ空）
+    """
+    game, seat, file_path, num_clusters = task
+    data = _load_file(file_path, num_clusters)
+    if data is None:
+        return pd.DataFrame(columns=COLUMNS)
+    return _tidy(game, seat, perform_clustering(data, num_clusters))
+
+
+def _load_task(task: tuple) -> tuple:
+    game, seat, file_path, num_clusters = task
+    return game, seat, _load_file(file_path, num_clusters)
+
+
+def cluster_pooled(files: list, num_clusters: int = 2, batch_size: int = 1024, workers: int = 1) -> pd.DataFrame:
+    """
+    全ての対局・席の心拍数を1人ずつ標準化してからまとめて、MiniBatchKMeansでクラスタリングする
+    クラスタは全員で共通なので、対局・席をまたいで比べられる
+    使う対局・席は対局・席ごとの方法と同じ（行数がクラスタの数より少ないものは使わない）
+    @param files find_bpm_filesの戻り値
+    @param num_clusters クラスタの数
+    @param batch_size MiniBatchKMeansのバッチの大きさ
+    @param workers 読み込みのプロセス数
+    @return 1行1サンプルのデータフレーム
+    """
+    tasks = [(game, seat, file_path, num_clusters) for game, seat, file_path in files]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            loaded = list(executor.map(_load_task, tasks))
+    else:
+        loaded = [_load_task(task) for task in tasks]
+    loaded = [(game, seat, data) for game, seat, data in loaded if data is not None]
+    if not loaded:
+        return pd.DataFrame(columns=COLUMNS)
+
+    scaled = np.concatenate([standardize(data['bpm'].to_numpy()) for _, _, data in loaded]).reshape(-1, 1)
+    kmeans = MiniBatchKMeans(n_clusters=num_clusters, batch_size=batch_size, random_state=42, n_init='auto')
+    labels = kmeans.fit_predict(scaled)
+
+    tables = []
+    offset = 0
+    for game, seat, data in loaded:
+        data['cluster'] = labels[offset:offset + len(data)]
+        offset += len(data)
+        tables.append(_tidy(game, seat, data))
+    return pd.concat(tables, ignore_index=True)
+
+
+def cluster_all(data_dir: str = './data', num_clusters: int = 2, workers: int = 1, pooled: bool = False,
+                batch_size: int = 1024) -> pd.DataFrame:
+    """
+    全ての対局・席の心拍数をクラスタリングし、1つの表にまとめる
+    pooledがFalseなら対局・席ごとに（test3.pyと同じ）KMeansで、プロセスを分けて並列に計算する
+    結果はworkersに関係なく対局の番号・席の順に並ぶ
+    @param data_dir 対局のフォルダがあるフォルダ
+    @param num_clusters クラスタの数
+    @param workers プロセス数
+    @param pooled Trueなら全員のデータをまとめてMiniBatchKMeansでクラスタリングする
+    @param batch_size MiniBatchKMeansのバッチの大きさ
+    @return 列がCOLUMNSのデータフレーム（high_cluster, low_clusterはidentify_extreme_clustersの結果）
+    """
+    files = find_bpm_files(data_dir)
+    if pooled:
+        return cluster_pooled(files, num_clusters, batch_size=batch_size, workers=workers)
+
+    tasks = [(game, seat, file_path, num_clusters) for game, seat, file_path in files]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(cluster_file, tasks))
+    else:
+        tables = [cluster_file(task) for task in tasks]
+    tables = [table for table in tables if len(table) > 0]
+    if not tables:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(tables, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='全ての対局・席の心拍数をクラスタリングして1つの表にまとめる')
+    parser.add_argument('--data', default='./data', help='対局のフォルダがあるフォルダ')
+    parser.add_argument('--clusters', type=int, default=2, help='クラスタの数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列に処理するプロセス数')
+    parser.add_argument('--pooled', action='store_true', help='全員のデータをまとめてMiniBatchKMeansでクラスタリングする')
+    parser.add_argument('--batch-size', type=int, default=1024, help='MiniBatchKMeansのバッチの大きさ')
+    parser.add_argument('--output', default='./output/bpm_clusters.csv', help='出力するcsv')
+    parser.add_argument('--log-level', default='WARNING', help='ログの出力レベル（使わなかったファイルはINFOで出す）')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+
+    clusters_df = cluster_all(args.data, num_clusters=args.clusters, workers=args.workers, pooled=args.pooled,
+                              batch_size=args.batch_size)
+    clusters_df.to_csv(args.output, index=False)
+    print(clusters_df.groupby(['game', 'seat'], sort=False)[['high_cluster', 'low_cluster']].first())
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# 驚愕・安堵を付ける行数（きっかけの行の後ろの行数、test3.pyのindex+5）
+STATE_LENGTH = 5
+
+
+def forward_fill_mask(mask: np.ndarray, length: int = STATE_LENGTH) -> np.ndarray:
+    """
+    Trueの行とその後ろlength行をTrueにする（length + 1行の幅の移動最大値）
+    @param mask きっかけの行がTrueの配列
+    @param length 後ろに広げる行数
+    @return 広げた配列
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if len(mask) == 0:
+        return mask
+    # 1がlength + 1個並んだものとの畳み込みが0より大きい行は、前のlength行以内にきっかけがある
+    return np.convolve(mask.astype(np.int32), np.ones(length + 1, dtype=np.int32))[:len(mask)] > 0
+
+
+def _cover_labels(labels: np.ndarray, triggers: np.ndarray, length: int) -> np.ndarray:
+    """
+    昇順のindexで、data.loc[t:t + length]（ラベルでの範囲）のどれかに入る行を求める
+    @param labels 昇順の整数のindex
+    @param triggers きっかけの行のラベル
+    @param length 後ろに広げるラベルの幅
+    @return 範囲に入る行がTrueの配列
+    """
+    starts = np.searchsorted(labels, triggers, side='left')
+    stops = np.searchsorted(labels, triggers + length, side='right')
+    # 範囲の始まりで+1、終わりで-1して累積和が0より大きい行が範囲に入る
+    counts = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.add.at(counts, starts, 1)
+    np.add.at(counts, stops, -1)
+    return np.cumsum(counts[:-1]) > 0
+
+
+def _cover(index: pd.Index, triggers: pd.Index, length: int) -> np.ndarray | None:
+    """きっかけの行のラベルから状態を付ける行を求める（ラベルが昇順の整数でない場合はNone）"""
+    if not (pd.api.types.is_integer_dtype(index) and index.is_monotonic_increasing and index.is_unique):
+        return None
+    labels = index.to_numpy(dtype=np.int64)
+    triggers = np.asarray(triggers, dtype=np.int64)
+    if len(labels) > 0 and labels[-1] - labels[0] == len(labels) - 1:
+        # 0, 1, 2, ...のように連続したindexなら、ラベルの範囲は行の範囲と同じ
+        return forward_fill_mask(np.isin(labels, triggers), length)
+    return _cover_labels(labels, triggers, length)
+
+
+def update_states_loop(data: pd.DataFrame, surprise_data: pd.DataFrame, relief_data: pd.DataFrame,
+                       length: int = STATE_LENGTH) -> pd.DataFrame:
+    """条件に合致したデータの状態を1行ずつ変更する（test3.pyの元の実装、indexが昇順の整数でない場合に使う）"""
+    for index in surprise_data.index:
+        data.loc[index:index + length, 'state'] = 'surprise'
+    for index in relief_data.index:
+        data.loc[index:index + length, 'state'] = 'relief'
+    return data
+
+
+def update_states(data: pd.DataFrame, surprise_data: pd.DataFrame, relief_data: pd.DataFrame,
+                  length: int = STATE_LENGTH) -> pd.DataFrame:
+    """
+    驚愕・安堵のきっかけの行から後ろlength行までのstateを変更する（update_states_loopと同じ結果）
+    安堵の範囲は驚愕の範囲より優先し、どちらでもない行のstateはそのままにする
+    @param data データフレーム（変更してそのまま返す）
+    @param surprise_data 驚愕のきっかけの行（filter_statesの戻り値）
+    @param relief_data 安堵のきっかけの行（filter_statesの戻り値）
+    @param length 後ろに広げる行数
+    @return stateを変更したデータフレーム
+    """
+    surprise = _cover(data.index, surprise_data.index, length)
+    relief = _cover(data.index, relief_data.index, length)
+    if surprise is None or relief is None:
+        return update_states_loop(data, surprise_data, relief_data, length)
+    if not surprise.any() and not relief.any():
+        return data
+
+    if 'state' in data.columns:
+        state = data['state'].to_numpy(dtype=object, copy=True)
+    else:
+        state = np.full(len(data), np.nan, dtype=object)
+    state[surprise] = 'surprise'
+    state[relief] = 'relief'
+    data['state'] = state
+    return data
+
+
+def run_length_intervals(times, states) -> list:
+    """
+    状態が同じ行が続く区間を求める（main2.ipynbのclassificationと同じ結果）
+    区間の終わりは次の区間の最初の行の時刻で、最後の区間の終わりは最後の行の時刻
+    @param times 時刻の配列
+    @param states 状態の配列
+    @return [開始時刻, 終了時刻, 状態] の一覧
+    """
+    times = np.asarray(times)
+    states = np.asarray(states, dtype=object)
+    if len(states) == 0:
+        return []
+    # 前の行と状態が違う行が区間の始まり（NaNはclassificationと同じく毎回違うものとして扱う）
+    starts = np.flatnonzero(np.concatenate([[True], states[1:] != states[:-1]]))
+    ends = np.append(times[starts[1:]], times[-1])
+    return [[start, end, state] for start, end, state in zip(times[starts].tolist(), ends.tolist(),
+                                                              states[starts].tolist())]
+
+
+def classification(heart_rate_df_diff: pd.DataFrame, column: str = 'status') -> list:
+    """
+    状態の列から色付けの区間を求める
+    @param heart_rate_df_diff time, statusの列を持つデータフレーム
+    @param column 状態の列
+    @return [start_time, end_time, color] の一覧
+    """
+    return run_length_intervals(heart_rate_df_diff['time'].to_numpy(), heart_rate_df_diff[column].to_numpy())
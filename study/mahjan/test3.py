@@ -4,6 +4,8 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import os
 
+import states
+
 def read_csv_data(file_path):
     """CSVデータを読み込みDataFrameに変換する"""
     return pd.read_csv(file_path)
@@ -37,12 +39,8 @@ def filter_states(data, high_cluster, low_cluster):
     return df_surprise, df_relief
 
 def update_states(data, surprise_data, relief_data):
-    """条件に合致したデータの状態を変更する"""
-    for index in surprise_data.index:
-        data.loc[index:index+5, 'state'] = 'surprise'
-    for index in relief_data.index:
-        data.loc[index:index+5, 'state'] = 'relief'
-    return data
+    """条件に合致したデータの状態を変更する（きっかけの行から後ろ5行まで、まとめて変更する）"""
+    return states.update_states(data, surprise_data, relief_data)
 
 def plot_clusters(data):
     """クラスタリング結果をグラフで表示する"""
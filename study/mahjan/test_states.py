@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from states import classification, update_states, update_states_loop
+
+
+def classification_loop(heart_rate_df_diff: pd.DataFrame) -> list:
+    """ベクトル化する前のmain2.ipynbのclassification（iterrowsで1行ずつ）"""
+    current_interval = None
+    color_intervals = []
+    for index, row in heart_rate_df_diff.iterrows():
+        if current_interval is None:
+            current_interval = [row['time'], None, row['status']]
+        elif current_interval[2] != row['status']:
+            current_interval[1] = row['time']
+            color_intervals.append(current_interval)
+            current_interval = [row['time'], None, row['status']]
+    if current_interval is not None:
+        current_interval[1] = heart_rate_df_diff['time'].iloc[-1]
+        color_intervals.append(current_interval)
+    return color_intervals
+
+
+def state_frame(seed: int, index_kind: str, rows: int = 300) -> tuple:
+    """心拍数のデータフレームと、驚愕・安堵のきっかけの行"""
+    rng = np.random.default_rng(seed)
+    if index_kind == 'range':
+        index = np.arange(rows)
+    elif index_kind == 'offset':
+        index = np.arange(rows) + 1000
+    else:
+        # 飛び飛びの昇順のindex（dropnaした後など）
+        index = np.cumsum(rng.integers(1, 4, rows))
+    data = pd.DataFrame({'time': np.arange(rows) * 1.5, 'bpm': rng.normal(80, 5, rows)}, index=index)
+    if seed % 2 == 0:
+        data['state'] = rng.choice(['normal', 'calm'], rows).astype(object)
+    surprise = data.iloc[np.sort(rng.choice(rows, rows // 20, replace=False))]
+    relief = data.iloc[np.sort(rng.choice(rows, rows // 20, replace=False))]
+    return data, surprise, relief
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('index_kind', ['range', 'offset', 'sparse'])
+def test_update_states_matches_loop(seed, index_kind):
+    data, surprise, relief = state_frame(seed, index_kind)
+    expected = update_states_loop(data.copy(), surprise, relief)
+    actual = update_states(data.copy(), surprise, relief)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_update_states_without_triggers_keeps_data():
+    data, surprise, relief = state_frame(0, 'range')
+    expected = data.copy()
+    actual = update_states(data, surprise.iloc[:0], relief.iloc[:0])
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def assert_intervals_equal(actual: list, expected: list) -> None:
+    assert len(actual) == len(expected)
+    for (start, end, state), (start_expected, end_expected, state_expected) in zip(actual, expected):
+        assert start == start_expected and end == end_expected
+        assert state == state_expected or (pd.isna(state) and pd.isna(state_expected))
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_classification_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    rows = 500
+    status = rng.choice(['black', 'red', 'blue'], rows, p=[.8, .1, .1]).astype(object)
+    # 同じ状態が続く区間を作り、NaNも混ぜる（NaNは毎回別の区間になる）
+    status = np.repeat(status[:rows // 5], 5)
+    status[rng.choice(rows, 10, replace=False)] = np.nan
+    df = pd.DataFrame({'time': np.cumsum(rng.uniform(0.5, 1.5, rows)), 'status': status})
+    assert_intervals_equal(classification(df), classification_loop(df))
+
+
+def test_classification_of_empty_frame():
+    assert classification(pd.DataFrame({'time': [], 'status': []})) == []